@@ -1,17 +1,43 @@
 from aiogram import Bot, Dispatcher
-from aiogram.types import FSInputFile
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import BufferedInputFile, FSInputFile, InputFile, Message
 import asyncio
-import re
 import logging
+from collections import defaultdict
+from pathlib import Path
+from typing import Awaitable, Callable
 from app.core.config import settings
+from app.core.rate_limiter import RateLimiter
 
 logger = logging.getLogger(settings.LOGGER_NAME)
 
-def _remove_html_tags(text):
-    return re.sub(r'<[^>]+>', '', text)
+# Telegram Bot API limits: ~30 messages per second overall, 20 messages per minute per group/channel
+TG_OVERALL_MAX_RATE = 30
+TG_CHAT_MAX_RATE_PER_MINUTE = 20
+
+def _remove_html_tags(text: str) -> str:
+    """Strip `<...>` tags in a single left-to-right pass using str.find"""
+    parts = []
+    pos = 0
+    while True:
+        start = text.find('<', pos)
+        if start < 0:
+            break
+        end = text.find('>', start + 1)
+        if end < 0:
+            break
+        if end == start + 1:
+            # "<>" is not a tag, keep it as is
+            parts.append(text[pos:end + 1])
+        else:
+            parts.append(text[pos:start])
+        pos = end + 1
+    parts.append(text[pos:])
+    return ''.join(parts)
 
 def _extract_title_from_rewrited_news(text: str) -> str:
-    title = text.split('\n')[0]
+    newline_pos = text.find('\n')
+    title = text if newline_pos < 0 else text[:newline_pos]
     title = _remove_html_tags(title)
     return title
 
@@ -21,20 +47,68 @@ class ChannelPoster:
         self.dp = Dispatcher()
         self.target_channels_ids = target_channels_ids
         self.service_channels_ids = service_channels_ids
+        # chat ids don't change between posts, build them once
+        self._news_chat_ids = [f"@{channel_id}" for channel_id in target_channels_ids + service_channels_ids]
+        self._service_chat_ids = [f"@{channel_id}" for channel_id in service_channels_ids]
+        self._sem = asyncio.Semaphore(settings.MAX_CONCURRENT_SENDS)
+        self._overall_limiter = RateLimiter(TG_OVERALL_MAX_RATE, 1)
+        self._chat_limiters: dict[str, RateLimiter] = defaultdict(
+            lambda: RateLimiter(TG_CHAT_MAX_RATE_PER_MINUTE, 60)
+        )
 
 
-    async def publish_news(self, message: str, image_path: str = None):
+    async def publish_news(self, message: str, image_path: str = None, image_data: bytes = None, image_name: str = "image.jpg"):
         if not self.target_channels_ids:
             logger.warning("No channels specified for publishing news.")
             return
         title = _extract_title_from_rewrited_news(message)
         logger.info(f"Publishing news: {title} to channels: {', '.join(self.target_channels_ids)}")
 
-        for channel_id in self.target_channels_ids:            
-            await self.send_photo(chat_id=f"@{channel_id}", image_path=image_path, caption=message, parse_mode="HTML")
-        for channel_id in self.service_channels_ids:            
-            await self.send_photo(chat_id=f"@{channel_id}", image_path=image_path, caption=message, parse_mode="HTML")
-        
+        if image_data is None and image_path is None:
+            # nothing to attach, send the caption as a plain text message
+            async def _send_text(chat_id: str):
+                async with self._sem:
+                    return await self.send_text(chat_id=chat_id, text=message, parse_mode="HTML")
+
+            await self._gather_sends(_send_text, self._news_chat_ids)
+            return
+
+        first_chat_id, *other_chat_ids = self._news_chat_ids
+        # Take the image from memory or read it from disk once, upload it once, then reuse Telegram's file_id for the other channels
+        if image_data is not None:
+            photo = BufferedInputFile(image_data, filename=image_name)
+        else:
+            image_file = Path(image_path)
+            photo = BufferedInputFile(await asyncio.to_thread(image_file.read_bytes), filename=image_file.name)
+        first_error = None
+        try:
+            first_message = await self.send_photo(chat_id=first_chat_id, photo=photo, caption=message, parse_mode="HTML")
+            if first_message.photo:
+                photo = first_message.photo[-1].file_id
+        except Exception as e:
+            # no file_id to reuse, the other channels get the upload itself
+            first_error = e
+
+        async def _send_one(chat_id: str):
+            async with self._sem:
+                return await self.send_photo(chat_id=chat_id, photo=photo, caption=message, parse_mode="HTML")
+
+        await self._gather_sends(_send_one, other_chat_ids, first_error)
+
+    @staticmethod
+    async def _gather_sends(
+        send_one: Callable[[str], Awaitable],
+        chat_ids: list[str],
+        first_error: Exception | None = None,
+    ) -> None:
+        """Send to every chat concurrently, a failing chat doesn't stop the others"""
+        results = await asyncio.gather(*(send_one(chat_id) for chat_id in chat_ids), return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if first_error is not None:
+            errors.insert(0, first_error)
+        if errors:
+            # every channel got its chance, now surface the failure to the caller
+            raise errors[0]
 
 
     async def send_service_report(self, channels_ids: list[str], message: str):
@@ -44,14 +118,32 @@ class ChannelPoster:
         title = _extract_title_from_rewrited_news(message)
         logger.info(f"Sending service report {title} to channels: {', '.join(channels_ids)}")
 
-        for channel_id in self.service_channels_ids:
-            await self.send_text(chat_id=f"@{channel_id}", text=message, parse_mode="HTML")
+        for chat_id in self._service_chat_ids:
+            await self.send_text(chat_id=chat_id, text=message, parse_mode="HTML")
     
 
+    async def _throttle(self, chat_id: str) -> None:
+        """Wait for both the per-chat and the overall Telegram rate limits"""
+        await self._chat_limiters[chat_id].acquire()
+        await self._overall_limiter.acquire()
+
+    async def _send(self, send_method: Callable[..., Awaitable[Message]], chat_id: str, **kwargs) -> Message:
+        """Call bot send method, waiting out Telegram flood control (RetryAfter) between tries"""
+        for attempt in range(1, settings.MAX_SENDING_TRIES + 1):
+            await self._throttle(chat_id)
+            try:
+                return await send_method(chat_id=chat_id, **kwargs)
+            except TelegramRetryAfter as e:
+                if attempt >= settings.MAX_SENDING_TRIES:
+                    raise
+                logger.warning(f"Flood control for {chat_id}, retrying in {e.retry_after}s")
+                await asyncio.sleep(e.retry_after + 0.1)
+
     async def send_text(self, chat_id: str, text: str, parse_mode: str = None) -> bool:
         """Send text message to channel"""
         try:
-            await self.bot.send_message(
+            await self._send(
+                self.bot.send_message,
                 chat_id=chat_id,
                 text=text,
                 parse_mode=parse_mode
@@ -61,16 +153,23 @@ class ChannelPoster:
             logging.error(f"Error sending text message: {e}")
             raise
     
-    async def send_photo(self, chat_id: str, image_path: str, caption: str = None, parse_mode: str = None) -> bool:
-        """Send photo to channel"""
+    async def send_photo(
+        self,
+        chat_id: str,
+        image_path: str = None,
+        caption: str = None,
+        parse_mode: str = None,
+        photo: InputFile | str = None
+    ) -> Message:
+        """Send photo to channel. `photo` may be an already uploaded file_id, otherwise image_path is uploaded"""
         try:
-            await self.bot.send_photo(
+            return await self._send(
+                self.bot.send_photo,
                 chat_id=chat_id,
-                photo=FSInputFile(image_path),
+                photo=photo or FSInputFile(image_path),
                 caption=caption,
                 parse_mode=parse_mode,
             )
-            return True
         except Exception as e:
             logging.error(f"Error sending photo: {e}")
             raise
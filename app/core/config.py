@@ -4,8 +4,11 @@ from pydantic import BaseModel, Field, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 import os
 import logging
+import queue
+import atexit
+from logging.handlers import QueueHandler, QueueListener
 from dotenv import load_dotenv, find_dotenv
-import json
+import orjson
 
 # Base directory setup
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -23,8 +26,29 @@ def load_env_file() -> bool:
 # Load environment variables
 load_env_file()
 
-with open(f"{APP_DIR}/publishing_schedule.json", "r") as f:
-    publishing_schedule = json.load(f)
+@lru_cache(maxsize=1)
+def load_publishing_schedule() -> list[dict]:
+    """Load publishing schedule from json file on first use."""
+    return orjson.loads((APP_DIR / "publishing_schedule.json").read_bytes())
+
+
+def _split_env_list(name: str) -> list[str]:
+    """Read comma separated list from environment variable."""
+    return [item.strip() for item in os.getenv(name, "").split(",") if item.strip()]
+
+
+# Parsed once, every TgBotSettings instance gets its own copy
+_TARGET_CHANNELS = _split_env_list("TG_BOT_TARGET_CHANNELS")
+_SERVICE_CHANNELS = _split_env_list("TG_BOT_SERVICE_CHANNELS")
+
+
+def _clean_channels(channels: list[str]) -> list[str]:
+    """Strip channel names, drop empty ones and prefix them with @."""
+    return [
+        channel if channel.startswith('@') else f'@{channel}'
+        for channel in (raw_channel.strip() for raw_channel in channels)
+        if channel
+    ]
 
 
 class TgBotSettings(BaseModel):
@@ -34,19 +58,11 @@ class TgBotSettings(BaseModel):
         description="Telegram Bot API Token"
     )
     TARGET_CHANNELS: list[str] = Field(
-        default_factory=lambda: (
-            os.getenv("TG_BOT_TARGET_CHANNELS", "").split(",")
-            if os.getenv("TG_BOT_TARGET_CHANNELS")
-            else []
-        ),
+        default_factory=lambda: list(_TARGET_CHANNELS),
         description="List of target Telegram channels"
     )
     SERVICE_CHANNELS: list[str] = Field(
-        default_factory=lambda: (
-            os.getenv("TG_BOT_SERVICE_CHANNELS", "").split(",")
-            if os.getenv("TG_BOT_SERVICE_CHANNELS")
-            else []
-        ),
+        default_factory=lambda: list(_SERVICE_CHANNELS),
         description="List of channels for service messages"
     )
 
@@ -55,31 +71,11 @@ class TgBotSettings(BaseModel):
         """Check if Telegram configuration is valid."""
         return bool(self.TOKEN and self.TARGET_CHANNELS and self.SERVICE_CHANNELS)
 
-    @field_validator('TARGET_CHANNELS')
+    @field_validator('TARGET_CHANNELS', 'SERVICE_CHANNELS')
     @classmethod
-    def validate_target_channels(cls, v):
+    def validate_channels(cls, v):
         """Validate and clean channel list."""
-        validated_channels = []
-        for channel in v:
-            channel = channel.strip()
-            if channel:
-                if not channel.startswith('@'):
-                    channel = f'@{channel}'
-                validated_channels.append(channel)
-        return validated_channels
-    
-    @field_validator('SERVICE_CHANNELS')
-    @classmethod
-    def validate_service_channels(cls, v):
-        """Validate and clean channel list."""
-        validated_channels = []
-        for channel in v:
-            channel = channel.strip()
-            if channel:
-                if not channel.startswith('@'):
-                    channel = f'@{channel}'
-                validated_channels.append(channel)
-        return validated_channels
+        return _clean_channels(v)
 
 
 class OpenAISettings(BaseModel):
@@ -107,6 +103,10 @@ class OpenAISettings(BaseModel):
         default=os.getenv("OPENAI_PROJECT_ID", "news-publisher"),
         description="Project identifier"
     )
+    SERVICE_TIER: str | None = Field(
+        default=os.getenv("OPENAI_SERVICE_TIER") or None,
+        description="OpenAI service tier, 'flex' trades response time for lower price"
+    )
 
     @field_validator('TEMPERATURE', mode='before')
     @classmethod
@@ -142,13 +142,27 @@ class Settings(BaseSettings):
     APP_DIR: Path = Field(default_factory=lambda: APP_DIR)
     TMP_DIR: Path = Field(default_factory=lambda: APP_DIR / "tmp")
     LOGS_DIR: Path = Field(default_factory=lambda: BASE_DIR / "logs")
-    PUBLISHING_SCHEDULE: list[dict] = publishing_schedule
     NEWS_TEXT_MAX_LENGTH: int = os.getenv("NEWS_TEXT_MAX_LENGTH", 1000)
     MAX_REWRITING_TRIES: int = os.getenv("MAX_REWRITING_TRIES", 3)
-    SCHEDULE: list[dict] = publishing_schedule
+    # news published per scheduled job, several are rewritten with one batch request
+    MAX_NEWS_PER_JOB: int = Field(os.getenv("MAX_NEWS_PER_JOB", 1), ge=1)
+    MAX_CONCURRENT_SENDS: int = Field(os.getenv("MAX_CONCURRENT_SENDS", 8), ge=1)
+    MAX_SENDING_TRIES: int = Field(os.getenv("MAX_SENDING_TRIES", 3), ge=1)
+    # feeds list items newest first, readers stop at the first too old one
+    FEEDS_ASSUME_CHRONOLOGICAL: bool = os.getenv("FEEDS_ASSUME_CHRONOLOGICAL", True)
     
     model_config = SettingsConfigDict(case_sensitive=True)
 
+    @property
+    def PUBLISHING_SCHEDULE(self) -> list[dict]:
+        """Publishing schedule, read from disk only when first needed."""
+        return load_publishing_schedule()
+
+    @property
+    def SCHEDULE(self) -> list[dict]:
+        """Alias of PUBLISHING_SCHEDULE."""
+        return load_publishing_schedule()
+
     @property
     def is_valid(self) -> bool:
         """Check if all required configurations are valid."""
@@ -198,16 +212,21 @@ def setup_logging(settings: Settings) -> logging.Logger:
     # Prevent propagation to root logger to avoid double logging
     logger.propagate = False
     
-    # Add console handler
+    # Create console handler
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
     
-    # Add file handler
+    # Create file handler
     log_file = settings.LOGS_DIR / "out.log"
     file_handler = logging.FileHandler(log_file)
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    
+    # Only enqueue records on the caller's thread, the listener thread does the actual writing
+    log_queue = queue.Queue(-1)
+    logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
     
     return logger
 
@@ -1,10 +1,219 @@
 import httpx
+import aiofiles
 import tempfile
 import os
 from pathlib import Path
-from contextlib import contextmanager, asynccontextmanager
-import shutil
-import urllib
+from contextlib import contextmanager, asynccontextmanager, AsyncExitStack
+import urllib.parse
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+
+from app.core.config import settings
+
+logger = logging.getLogger(settings.LOGGER_NAME)
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_TIMEOUT = httpx.Timeout(connect=5.0, read=30.0, write=10.0, pool=5.0)
+
+IMAGE_CACHE_MAX_FILES = 200
+# downloads in progress live in the cache dir too (same filesystem for os.replace), under this prefix
+IMAGE_CACHE_TEMP_PREFIX = '.tmp_'
+
+_client: httpx.AsyncClient | None = None
+_sync_client: httpx.Client | None = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Get shared async HTTP client, so connections are kept alive between downloads"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=DOWNLOAD_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=20),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Close shared async HTTP client"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_sync_client() -> httpx.Client:
+    """Get shared sync HTTP client for temp_download_sync"""
+    global _sync_client
+    if _sync_client is None or _sync_client.is_closed:
+        _sync_client = httpx.Client(
+            follow_redirects=True,
+            timeout=DOWNLOAD_TIMEOUT,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+    return _sync_client
+
+
+def close_sync_client() -> None:
+    """Close shared sync HTTP client"""
+    global _sync_client
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
+
+
+def url_to_filename(url: str) -> str:
+    """Stable, filesystem-safe file name for URL: short hash plus the extension of the URL path"""
+    digest = hashlib.blake2b(url.encode(), digest_size=12).hexdigest()
+    suffix = Path(urllib.parse.urlparse(url).path).suffix
+    return f"{digest}{suffix}"
+
+
+class ImageCache:
+    """Bounded on-disk LRU cache of downloaded images, keyed by url_to_filename(url)"""
+
+    def __init__(self, cache_dir: Path, max_files: int = IMAGE_CACHE_MAX_FILES):
+        self.cache_dir = cache_dir
+        self.max_files = max_files
+        self._entries: OrderedDict[str, Path] | None = None
+        # key -> number of callers still using the cached file, pinned entries are not evicted
+        self._pinned: dict[str, int] = {}
+
+    def _load(self) -> OrderedDict[str, Path]:
+        """Pick up files cached by previous runs, oldest first"""
+        if self._entries is None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            files = []
+            for path in self.cache_dir.iterdir():
+                if path.name.startswith(IMAGE_CACHE_TEMP_PREFIX):
+                    # download interrupted by a previous run
+                    path.unlink(missing_ok=True)
+                elif path.is_file():
+                    files.append(path)
+            files.sort(key=lambda path: path.stat().st_mtime)
+            self._entries = OrderedDict((path.name, path) for path in files)
+            self._evict()
+        return self._entries
+
+    def temp_file(self, key: str, prefix: str = "") -> Path:
+        """Create an empty temp file in the cache dir, so put() can move it in without crossing filesystems"""
+        self._load()
+        filename = Path(key)
+        fd, temp_name = tempfile.mkstemp(
+            prefix=f"{IMAGE_CACHE_TEMP_PREFIX}{prefix}{filename.stem}_",
+            suffix=filename.suffix,
+            dir=self.cache_dir,
+        )
+        os.close(fd)
+        return Path(temp_name)
+
+    @contextmanager
+    def pin(self, key: str):
+        """Keep the entry from being evicted while the caller uses its file"""
+        self._pinned[key] = self._pinned.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            count = self._pinned.pop(key) - 1
+            if count:
+                self._pinned[key] = count
+
+    def get(self, key: str) -> Path | None:
+        entries = self._load()
+        path = entries.get(key)
+        if path is None:
+            return None
+        if not path.exists():
+            del entries[key]
+            return None
+        entries.move_to_end(key)
+        return path
+
+    def put(self, key: str, file_path: Path) -> Path:
+        """Move file into the cache and return its new location"""
+        entries = self._load()
+        path = self.cache_dir / key
+        os.replace(file_path, path)
+        entries[key] = path
+        entries.move_to_end(key)
+        self._evict()
+        return path
+
+    def _evict(self) -> None:
+        """Drop the least recently used files over max_files, pinned ones wait for a later put()"""
+        excess = len(self._entries) - self.max_files
+        for key in list(self._entries):
+            if excess <= 0:
+                break
+            if key in self._pinned:
+                continue
+            self._entries.pop(key).unlink(missing_ok=True)
+            excess -= 1
+
+
+_image_cache = ImageCache(settings.TMP_DIR / "img_cache")
+
+
+def _is_identity_encoded(response: httpx.Response) -> bool:
+    """Body is stored as is on the wire, so raw bytes can skip httpx decoders"""
+    return response.headers.get('Content-Encoding', 'identity').lower() == 'identity'
+
+
+async def _preallocate(fd: int, content_length: str | None) -> None:
+    """Reserve file blocks up front when the size is known (Linux only), so writes don't grow the file chunk by chunk"""
+    if not content_length or not content_length.isdigit() or not hasattr(os, 'posix_fallocate'):
+        return
+    try:
+        await asyncio.to_thread(os.posix_fallocate, fd, 0, int(content_length))
+    except OSError:
+        # filesystem without fallocate support, plain writes will do
+        pass
+
+
+def _image_headers(url: str) -> dict[str, str]:
+    return {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Referer': urllib.parse.urljoin(url, '/'),  # Add referrer from same domain
+    }
+
+
+async def download_bytes_async(url: str) -> bytes:
+    """
+    Download file into memory, for callers that decode it right away.
+    The body is also stored in the image cache
+    
+    Args:
+        url (str): URL of the file to download
+    
+    Returns:
+        bytes: File content. Images already in the image cache are read from it
+    """
+    cache_key = url_to_filename(url)
+    cached_path = _image_cache.get(cache_key)
+    if cached_path:
+        return await asyncio.to_thread(cached_path.read_bytes)
+    
+    response = await get_client().get(url, headers=_image_headers(url))
+    response.raise_for_status()
+    data = response.content
+    # keep a copy for repeated URLs, the write runs in a thread and a failure only costs the cache entry
+    temp_path = None
+    try:
+        temp_path = _image_cache.temp_file(cache_key)
+        await asyncio.to_thread(temp_path.write_bytes, data)
+        _image_cache.put(cache_key, temp_path)
+    except OSError as e:
+        logger.warning(f"Failed to cache image {url}: {e}")
+    finally:
+        if temp_path is not None:
+            temp_path.unlink(missing_ok=True)
+    return data
+
 
 @asynccontextmanager
 async def temp_download_async(url: str, prefix: str = "download_"):
@@ -13,38 +222,70 @@ async def temp_download_async(url: str, prefix: str = "download_"):
     
     Args:
         url (str): URL of the file to download
-        prefix (str): Prefix for temp directory name
+        prefix (str): Prefix for temp file name
     
     Yields:
-        Path: Path to downloaded temporary file
+        Path: Path to downloaded file. Files are kept in the image cache,
+            so repeated URLs are not downloaded again; don't modify or delete it
     """
-    temp_dir = tempfile.mkdtemp(prefix=prefix)
-    temp_path = None
+    cache_key = url_to_filename(url)
+    cached_path = _image_cache.get(cache_key)
+    if cached_path:
+        with _image_cache.pin(cache_key):
+            yield cached_path
+        return
     
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'image/avif,image/webp,image/apng,image/svg+xml,image/*,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.9',
-        'Referer': urllib.parse.urljoin(url, '/'),  # Add referrer from same domain
-    }
+    temp_path = _image_cache.temp_file(cache_key, prefix)
     
     try:
-        filename = os.path.basename(url)
-        temp_path = Path(temp_dir) / filename
-        
-        async with httpx.AsyncClient() as client:
-            async with client.stream('GET', url, headers=headers, follow_redirects=True) as response:
-                response.raise_for_status()
-                
-                with open(temp_path, 'wb') as f:
-                    async for chunk in response.aiter_bytes():
-                        f.write(chunk)
+        client = get_client()
+        async with client.stream('GET', url, headers=_image_headers(url)) as response:
+            response.raise_for_status()
+            
+            async with aiofiles.open(temp_path, 'wb') as f:
+                await _preallocate(f.fileno(), response.headers.get('Content-Length'))
+                if _is_identity_encoded(response):
+                    chunks = response.aiter_raw(chunk_size=DOWNLOAD_CHUNK_SIZE)
+                else:
+                    chunks = response.aiter_bytes(chunk_size=DOWNLOAD_CHUNK_SIZE)
+                async for chunk in chunks:
+                    await f.write(chunk)
+                # drop preallocated tail if the body was shorter than announced
+                await f.truncate()
         
-        yield temp_path
+        with _image_cache.pin(cache_key):
+            yield _image_cache.put(cache_key, temp_path)
         
     finally:
-        if temp_dir and os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
+        temp_path.unlink(missing_ok=True)
+
+@asynccontextmanager
+async def temp_download_many(urls: list[str], prefix: str = "download_", limit: int = 8):
+    """
+    Async context manager for concurrent temporary download of several files
+    
+    Args:
+        urls (list[str]): URLs of the files to download
+        prefix (str): Prefix for temp file names
+        limit (int): Maximum number of simultaneous downloads
+    
+    Yields:
+        list[Path]: Paths to downloaded files, in the same order as urls
+    """
+    semaphore = asyncio.Semaphore(limit)
+    
+    async with AsyncExitStack() as stack:
+        async def _download_one(url: str) -> Path:
+            async with semaphore:
+                return await stack.enter_async_context(temp_download_async(url, prefix=prefix))
+        
+        # wait for every download before failing, so all temp files are registered for cleanup
+        results = await asyncio.gather(*(_download_one(url) for url in urls), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        
+        yield results
 
 @contextmanager
 def temp_download_sync(url: str, prefix: str = "download_"):
@@ -53,31 +294,45 @@ def temp_download_sync(url: str, prefix: str = "download_"):
     
     Args:
         url (str): URL of the file to download
-        prefix (str): Prefix for temp directory name
+        prefix (str): Prefix for temp file name
     
     Yields:
-        Path: Path to downloaded temporary file
+        Path: Path to downloaded file. Files are kept in the image cache,
+            so repeated URLs are not downloaded again; don't modify or delete it
     """
-    temp_dir = tempfile.mkdtemp(prefix=prefix)
-    temp_path = None
+    cache_key = url_to_filename(url)
+    cached_path = _image_cache.get(cache_key)
+    if cached_path:
+        with _image_cache.pin(cache_key):
+            yield cached_path
+        return
+    
+    temp_path = _image_cache.temp_file(cache_key, prefix)
     
     try:
-        filename = os.path.basename(url)
-        temp_path = Path(temp_dir) / filename
-        
-        with httpx.Client() as client:
-            with client.stream('GET', url) as response:
-                response.raise_for_status()
-                
-                with open(temp_path, 'wb') as f:
-                    for chunk in response.iter_bytes():
-                        f.write(chunk)
+        client = get_sync_client()
+        with client.stream('GET', url, headers=_image_headers(url)) as response:
+            response.raise_for_status()
+            
+            if _is_identity_encoded(response):
+                chunks = response.iter_raw(chunk_size=DOWNLOAD_CHUNK_SIZE)
+            else:
+                chunks = response.iter_bytes(chunk_size=DOWNLOAD_CHUNK_SIZE)
+            # raw fd writes, no Python file object buffering in between
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            try:
+                for chunk in chunks:
+                    view = memoryview(chunk)
+                    while view:
+                        view = view[os.write(fd, view):]
+            finally:
+                os.close(fd)
         
-        yield temp_path
+        with _image_cache.pin(cache_key):
+            yield _image_cache.put(cache_key, temp_path)
         
     finally:
-        if temp_dir and os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
+        temp_path.unlink(missing_ok=True)
 
 # Example usage with async
 async def main():
@@ -1,93 +1,289 @@
-import feedparser
+import asyncio
+import datetime as dt
+import fastfeedparser
+import httpx
+import os
+import re
+import sys
 import time
-from newspaper import Article
+import trafilatura
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from lxml import etree
 
-def get_full_article_text(url):
+# Decrypt's SCENE banner anywhere in the text, and everything from the "Edited by" footer on
+_CLEAN_RE = re.compile(r"Decrypt’s Art, Fashion, and Entertainment Hub\. Discover SCENE|Edited by.*", re.S)
+
+FEED_CHUNK_SIZE = 64 * 1024
+MEDIA_NS = '{http://search.yahoo.com/mrss/}'
+
+# how many articles are downloaded at the same time
+ARTICLES_CONCURRENCY = 10
+
+ARTICLE_CACHE_MAX_SIZE = 512
+ARTICLE_CHUNK_SIZE = 64 * 1024
+# article text sits in the first few hundred KiB, the rest of a huge page is scripts and comments
+MAX_ARTICLE_SIZE = 5 * 1024 * 1024
+# parsing runs in worker threads (lxml releases the GIL), no point in more of them than cores
+PARSE_CONCURRENCY = os.cpu_count() or 1
+
+# one pooled client for feeds and articles, keep-alive saves a TLS handshake per request
+_client = httpx.AsyncClient(
+    timeout=httpx.Timeout(30),
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=300),
+    follow_redirects=True,
+)
+
+
+async def close_client():
+    """Close the shared HTTP client"""
+    await _client.aclose()
+
+
+# feed url -> (etag, last-modified, parsed feed) of the last full response
+_feed_cache: dict[str, tuple[str | None, str | None, fastfeedparser.FastFeedParserDict]] = {}
+
+
+async def fetch_feed(url: str) -> fastfeedparser.FastFeedParserDict:
+    """Download and parse feed, using a conditional GET so an unchanged feed is not downloaded and parsed again"""
+    headers = {}
+    cached = _feed_cache.get(url)
+    if cached:
+        etag, modified, _ = cached
+        if etag:
+            headers['If-None-Match'] = etag
+        if modified:
+            headers['If-Modified-Since'] = modified
+
+    async with _client.stream('GET', url, headers=headers) as response:
+        if response.status_code == 304 and cached:
+            return cached[2]
+        response.raise_for_status()
+        feed = await _parse_feed_stream(response)
+
+    _feed_cache[url] = (response.headers.get('etag'), response.headers.get('last-modified'), feed)
+    return feed
+
+
+async def _parse_feed_stream(response: httpx.Response) -> fastfeedparser.FastFeedParserDict:
     """
-    Extract full text content from a news article URL
+    Parse RSS incrementally while it downloads, every <item> is turned into an entry and dropped from the tree,
+    so memory follows one item instead of the whole feed. Other formats (Atom etc.) are buffered for fastfeedparser
     """
+    parser = etree.XMLPullParser(events=('start', 'end'))
+    feed_info = fastfeedparser.FastFeedParserDict()
+    entries = []
+    # chunks are kept only until the root element shows whether it is RSS
+    buffered: list[bytes] | None = []
+    is_rss = None
+    async for chunk in response.aiter_bytes(FEED_CHUNK_SIZE):
+        if is_rss is False:
+            buffered.append(chunk)
+            continue
+        if is_rss is None:
+            buffered.append(chunk)
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if is_rss is None:
+                is_rss = element.tag == 'rss'
+                if is_rss:
+                    buffered = None
+                else:
+                    break
+            if event != 'end':
+                continue
+            if element.tag == 'item':
+                entries.append(_entry_from_item(element))
+                element.clear()
+                # cleared items still hang on the channel, drop them too
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+            elif element.tag == 'title' and element.getparent() is not None and element.getparent().tag == 'channel':
+                feed_info['title'] = (element.text or '').strip()
+
+    if not is_rss:
+        return fastfeedparser.parse(b''.join(buffered))
+    parser.close()
+    return fastfeedparser.FastFeedParserDict(feed=feed_info, entries=entries)
+
+
+def _entry_from_item(item) -> fastfeedparser.FastFeedParserDict:
+    """Build an entry with the same keys fastfeedparser gives for RSS items"""
+    entry = fastfeedparser.FastFeedParserDict(
+        title=(item.findtext('title') or '').strip(),
+        link=(item.findtext('link') or '').strip(),
+        tags=[{'term': category.text.strip()} for category in item.iterfind('category') if category.text],
+    )
+    pub_date = item.findtext('pubDate')
+    if pub_date:
+        try:
+            # fastfeedparser gives ISO 8601 dates, keep the same format
+            entry['published'] = parsedate_to_datetime(pub_date.strip()).isoformat()
+        except (TypeError, ValueError):
+            pass
+    enclosures = [
+        {'url': enclosure.get('url'), 'type': enclosure.get('type')}
+        for enclosure in item.iterfind('enclosure') if enclosure.get('url')
+    ]
+    if enclosures:
+        entry['enclosures'] = enclosures
+    media_content = [{'url': media.get('url')} for media in item.iterfind(f'{MEDIA_NS}content') if media.get('url')]
+    if media_content:
+        entry['media_content'] = media_content
+    return entry
+
+
+async def fetch_html(url: str) -> bytes:
+    """
+    Stream article page into bytes, pages larger than MAX_ARTICLE_SIZE are cut there.
+    Bytes go to the parser undecoded, lxml picks the charset from the page itself
+    """
+    chunks = []
+    size = 0
+    async with _client.stream('GET', url) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes(ARTICLE_CHUNK_SIZE):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= MAX_ARTICLE_SIZE:
+                break
+    return b''.join(chunks)
+
+
+# article url -> extracted content, the same story stays the latest one in its category for many polls
+_article_cache: OrderedDict[str, dict] = OrderedDict()
+_parse_semaphore = asyncio.Semaphore(PARSE_CONCURRENCY)
+
+
+async def get_full_article_text(url, html: str | bytes | None = None):
+    """
+    Extract full text content from a news article URL.
+    Already downloaded `html` is parsed as is, otherwise it is fetched with the shared client.
+    Extracted articles are kept in a bounded LRU cache keyed by URL
+    """
+    if html is None and url in _article_cache:
+        _article_cache.move_to_end(url)
+        return dict(_article_cache[url])
     try:
-        # Initialize article object
-        article = Article(url)
-        
-        # Download and parse article
-        article.download()
-        article.parse()
-        text = _clean_text(article.text)
-        
-        result = {
-            'text': text,
-            'title': article.title,
-        }
-        if article.has_top_image():
-            result['top_image'] = article.top_image
-        return result
+        if html is None:
+            html = await fetch_html(url)
+        result = await parse_article(url, html)
     except Exception as e:
         print(f"Error extracting article content from {url}: {str(e)}")
         return None
+    _article_cache[url] = result
+    _article_cache.move_to_end(url)
+    while len(_article_cache) > ARTICLE_CACHE_MAX_SIZE:
+        _article_cache.popitem(last=False)
+    return dict(result)
+
+
+async def parse_article(url: str, html: str | bytes) -> dict:
+    """Parse article html in a worker thread, so feeds and other articles keep downloading meanwhile"""
+    async with _parse_semaphore:
+        return await asyncio.to_thread(_parse_article, url, html)
+
+
+def _parse_article(url: str, html: str | bytes) -> dict:
+    tree = trafilatura.load_html(html)
+    if tree is None:
+        raise ValueError("Unable to parse article html")
+    # read meta tags before trafilatura prunes the tree during extraction
+    title = _get_meta_content(tree, 'og:title') or (tree.findtext('.//title') or '').strip()
+    top_image = _get_meta_content(tree, 'og:image')
+    text = trafilatura.extract(
+        tree,
+        url=url,
+        include_comments=False,
+        include_tables=False,
+        favor_precision=True,
+    )
+    
+    result = {
+        'text': _clean_text(text or ''),
+        'title': title,
+    }
+    if top_image:
+        result['top_image'] = top_image
+    return result
+
+
+def _get_meta_content(tree, property_name: str) -> str | None:
+    values = tree.xpath(f'//meta[@property="{property_name}"]/@content')
+    return values[0].strip() if values else None
     
 
 def _clean_text(text: str) -> str:
     """
     Clean the text by removing unnecessary characters and blocks
     """
-    text = text.replace("Decrypt’s Art, Fashion, and Entertainment Hub. Discover SCENE", "")
-    text = text.split("Edited by")[0]
-    text = text.strip()
-    return text
+    return _CLEAN_RE.sub("", text).strip()
 
 
 
-def get_latest_news_with_content(feed_urls, target_categories):
+async def get_latest_news_with_content(feed_urls, target_categories):
     """
     Get the latest news with full content for each category
     """
     news_by_category = {}
-    
-    for feed_url in feed_urls:
-        try:
-            feed = feedparser.parse(feed_url)
-            
-            for entry in feed.entries:
-                # Get categories
-                entry_categories = []
-                if hasattr(entry, 'tags'):
-                    entry_categories = [tag.term.lower() for tag in entry.tags]
-                
-                # Get image URL
-                image_url = None
-                if hasattr(entry, 'enclosures') and entry.enclosures:
-                    for enclosure in entry.enclosures:
-                        if enclosure.type and enclosure.type.startswith('image/'):
-                            image_url = enclosure.url
-                elif hasattr(entry, 'media_thumbnail') and entry.media_thumbnail:
-                    image_url = entry.media_thumbnail[0]['url']
-                
-                # Check categories
-                for category in target_categories:
-                    if category.lower() in entry_categories:
-                        # Get full article content
-                        article_content = get_full_article_text(entry.link)
-                        # article_content = get_full_article_text("https://decrypt.co/296539/chill-guy-solana-meme-coin-plummets-creator-hack")
-                        
-                        if article_content:
-                            news_item = {
-                                'title': entry.title,
-                                'link': entry.link,
-                                'published': entry.published,
-                                'source': feed.feed.title,
-                                'image_url': article_content['top_image'] or image_url,
-                                'full_text': article_content['text'],
-                                'timestamp': time.mktime(entry.published_parsed) if entry.get('published_parsed') else time.time()
-                            }
-                            
-                            # Update if it's newer than existing entry
-                            if category not in news_by_category or \
-                               news_item['timestamp'] > news_by_category[category]['timestamp']:
-                                news_by_category[category] = news_item
-                
-        except Exception as e:
-            print(f"Error processing feed {feed_url}: {str(e)}")
+    semaphore = asyncio.Semaphore(ARTICLES_CONCURRENCY)
+    # lowercased once per call, entries are matched with a set intersection
+    target_by_lower = {category.lower(): category for category in target_categories}
+
+    async def handle_entry(feed, entry):
+        """Download the article of an entry matching target categories, returns [(category, news_item)]"""
+        # Get categories
+        entry_categories = {sys.intern(tag['term'].lower()) for tag in entry.get('tags', []) if tag.get('term')}
+        
+        # Check categories first, nothing else is needed for entries that don't match
+        matched_categories = [target_by_lower[category] for category in target_by_lower.keys() & entry_categories]
+        if not matched_categories:
+            return []
+        
+        # Get image URL
+        image_url = None
+        if entry.get('enclosures'):
+            for enclosure in entry.enclosures:
+                if (enclosure.get('type') or '').startswith('image/'):
+                    image_url = enclosure['url']
+        elif entry.get('media_content'):
+            image_url = entry.media_content[0]['url']
+
+        # Get full article content, once for all matched categories
+        async with semaphore:
+            article_content = await get_full_article_text(entry.link)
+        if not article_content:
+            return []
+
+        news_item = {
+            'title': entry.title,
+            'link': entry.link,
+            'published': entry.get('published'),
+            'source': feed.feed.get('title'),
+            'image_url': article_content.get('top_image') or image_url,
+            'full_text': article_content['text'],
+            # fastfeedparser gives ISO 8601 dates instead of struct_time
+            'timestamp': dt.datetime.fromisoformat(entry.published).timestamp() if entry.get('published') else time.time()
+        }
+        return [(category, news_item) for category in matched_categories]
+
+    feeds = await asyncio.gather(*(fetch_feed(feed_url) for feed_url in feed_urls), return_exceptions=True)
+    tasks = []
+    for feed_url, feed in zip(feed_urls, feeds):
+        if isinstance(feed, Exception):
+            print(f"Error processing feed {feed_url}: {str(feed)}")
+            continue
+        tasks.extend(handle_entry(feed, entry) for entry in feed.entries)
+
+    for result in await asyncio.gather(*tasks, return_exceptions=True):
+        if isinstance(result, Exception):
+            print(f"Error processing entry: {str(result)}")
+            continue
+        for category, news_item in result:
+            # Update if it's newer than existing entry
+            if category not in news_by_category or \
+               news_item['timestamp'] > news_by_category[category]['timestamp']:
+                news_by_category[category] = news_item
     
     return news_by_category
 
@@ -120,8 +316,14 @@ if __name__ == "__main__":
         "Coins",
     ]
     
+    async def main():
+        try:
+            return await get_latest_news_with_content(feeds, categories)
+        finally:
+            await close_client()
+
     # Get latest news with full content
-    latest_news = get_latest_news_with_content(feeds, categories)
+    latest_news = asyncio.run(main())
     
     # Display results
     display_full_news(latest_news)
\ No newline at end of file
@@ -1,12 +1,17 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 import datetime as dt
 
 
 class NewsItem(BaseModel):
+    """News item. Feed readers build it with model_construct from already parsed fields, skipping validation"""
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
     title: str
     link: str
     published_at: dt.datetime
     source: str
     category: str | None = None
     summary: str = ""
-    img_link: str | None = None
\ No newline at end of file
+    img_link: str | None = None
+    # feed guid, the link when the feed has none
+    guid: str = ""
\ No newline at end of file
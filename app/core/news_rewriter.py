@@ -1,26 +1,152 @@
+import asyncio
+import hashlib
+import math
+import httpx
 import openai
+import orjson
 import re
+import time
 import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable
 
 from app.core.config import settings
 from app.core.exceptions import RewritedNewsIsTooLongError
 
 logger = logging.getLogger(settings.LOGGER_NAME)
 
+DEFAULT_REWRITE_MAX_SYMBOLS = 600
+MAX_TITLE_LEN = 77
+# rough English average, used to keep max_tokens close to the asked length
+SYMBOLS_PER_TOKEN = 3.5
+# scheduler jobs for different categories rewrite at the same time, keep them under the rate limit
+MAX_CONCURRENT_REWRITES = 4
+# openai client retries 429/5xx with exponential backoff
+OPENAI_MAX_RETRIES = 3
+# one pool per process (see get_rewriter), sized for concurrent and batched rewrites
+OPENAI_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+OPENAI_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+# flex requests wait in a queue, give them more time before giving up
+FLEX_TIMEOUT = httpx.Timeout(15 * 60.0, connect=5.0)
+# room for the JSON keys and quoting around body and title
+STRUCTURED_OUTPUT_EXTRA_TOKENS = 30
+RESPONSE_CACHE_MAX_SIZE = 512
+RESPONSE_CACHE_TTL = 15 * 60
+RETRY_TEMPERATURE_STEP = 0.1
+
+_REWRITER_SYSTEM_PROMPT = "You are a professional content rewriter specializing in the 'Ghost on the block' style. STRICT OUTPUT LIMIT: 400 symbols."
+_TITLE_SYSTEM_PROMPT = "You are a professional caption creator specializing in the 'Ghost on the block' style. STRICT OUTPUT LIMIT: 77 symbols."
+_BATCH_SYSTEM_PROMPT = (
+    "You are a professional content rewriter and caption creator specializing in the 'Ghost on the block' style. "
+    "Answer with a JSON object: the list 'news' with one {'title', 'body'} object per article, in the given order."
+)
+_STRUCTURED_SYSTEM_PROMPT = (
+    "You are a professional content rewriter and caption creator specializing in the 'Ghost on the block' style. "
+    "Answer with JSON: the rewrite in 'body' and its caption in 'title'."
+)
+
+
+class ResponseCache:
+    """Small in-memory LRU of chat completion answers with a TTL"""
+
+    def __init__(self, max_size: int = RESPONSE_CACHE_MAX_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[bytes, tuple[float, str]] = OrderedDict()
+
+    def get(self, key: bytes) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, content = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return content
+
+    def put(self, key: bytes, content: str) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, content)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+_response_cache = ResponseCache()
+
+
+def _supports_structured_outputs(model: str) -> bool:
+    """json_schema response_format needs gpt-4o or newer, gpt-3.5 and gpt-4(-turbo) answer 400"""
+    return not (model.startswith(('gpt-3.5', 'gpt-4-')) or model == 'gpt-4')
+
+
+def _response_cache_key(model: str, temperature: float, system_prompt: str, prompt: str, params: dict) -> bytes:
+    payload = orjson.dumps([model, temperature, system_prompt, prompt, params], option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
 
 class NewsRewriter:
     def __init__(self, api_key: str):
         """Initialize with OpenAI API key"""
-        self.client = openai.OpenAI(api_key=api_key, project=settings.openai.PROJECT_ID)
-
-
-    def rewrite_news(self, news_url: str, max_news_text_len: int = 1000, max_rewriting_tries: int = 3):
-        for _ in range(max_rewriting_tries):
-            news =  self.rewrite_news_from_url(news_url)
+        self.client = openai.AsyncOpenAI(
+            api_key=api_key,
+            project=settings.openai.PROJECT_ID,
+            max_retries=OPENAI_MAX_RETRIES,
+            timeout=OPENAI_TIMEOUT,
+            # keeps openai default redirects and transport options, only the pool is tuned
+            http_client=openai.DefaultAsyncHttpxClient(limits=OPENAI_LIMITS),
+        )
+        # settings don't change at runtime, read them once instead of on every request
+        self._model = settings.openai.MODEL
+        self._temperature = settings.openai.TEMPERATURE
+        self._max_tokens = settings.openai.MAX_TOKENS
+        self._service_tier = settings.openai.SERVICE_TIER
+        # cleared on the first 400, so a model without json_schema support costs one failed request at most
+        self._structured_outputs = _supports_structured_outputs(self._model)
+
+
+    async def rewrite_news(
+        self,
+        news_url: str,
+        max_news_text_len: int = 1000,
+        max_rewriting_tries: int = 3,
+        news_title: str | None = None,
+    ):
+        # the title is written once, retries only rewrite the body with a tighter limit
+        max_symbols = DEFAULT_REWRITE_MAX_SYMBOLS
+        # body and title in one length-bounded call, the separate requests are the fallback
+        structured = await self.rewrite_structured_from_url(news_url, max_symbols=max_symbols)
+        if structured:
+            text, title = structured
+        elif news_title:
+            # caption from the original title doesn't wait for the body, ask for both at once
+            text, title = await asyncio.gather(
+                self.rewrite_text_from_url(news_url, max_symbols=max_symbols),
+                self.create_title(news_title),
+            )
+        else:
+            text = await self.rewrite_text_from_url(news_url, max_symbols=max_symbols)
+            title = await self.create_title(text)
+        if len(title) > MAX_TITLE_LEN:
+            title = news_title[:MAX_TITLE_LEN] if news_title else title[:MAX_TITLE_LEN].rstrip()
+
+        for attempt in range(1, max_rewriting_tries + 1):
+            if attempt > 1:
+                # a bit warmer on every retry, so it is a fresh answer and not the cached one
+                temperature = min(round(self._temperature + RETRY_TEMPERATURE_STEP * (attempt - 1), 2), 2.0)
+                text = await self.rewrite_text_from_url(news_url, max_symbols=max_symbols, temperature=temperature)
+            news = format_news(news_text=text, news_title=title)
+            if not text:
+                # nothing to publish and nothing to rescale the length by, just ask again
+                logger.warning("Rewrited news text is empty. Trying again...")
+                continue
             if len(news) <= max_news_text_len:
                 return news
             logger.warning("Rewrited news is too long. Trying again...")
             logger.info(f"REWRITED TEXT: {news}")
+            # shrink the asked length by how much the body overshot its share of the budget
+            text_budget = max_news_text_len - (len(news) - len(text))
+            max_symbols = max(1, int(max_symbols * text_budget / len(text)))
         raise RewritedNewsIsTooLongError(
             error_message="Unable to rewrite news in setted length",
             original_news=f"from {news_url}",
@@ -28,22 +154,56 @@ class NewsRewriter:
             rewrited_news_length=len(news)
         )
 
-    def rewrite_news_from_url(self, url: str) -> str:
-        prompt = create_rewriting_from_url_prompt(url)
-        response = self.client.chat.completions.create(
-            model=settings.openai.MODEL,
-            messages=[
-                {"role": "system", "content": "You are a professional content rewriter specializing in the 'Ghost on the block' style. STRICT OUTPUT LIMIT: 400 symbols."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=settings.openai.TEMPERATURE,
-            max_tokens=settings.openai.MAX_TOKENS
-        )
-        text = response.choices[0].message.content
-        title = self.create_title(text)
+    async def rewrite_news_from_url(self, url: str) -> str:
+        text = await self.rewrite_text_from_url(url)
+        title = await self.create_title(text)
         return format_news(news_text=text, news_title=title)
+
+    async def rewrite_structured_from_url(
+        self,
+        url: str,
+        max_symbols: int = DEFAULT_REWRITE_MAX_SYMBOLS,
+    ) -> tuple[str, str] | None:
+        """
+        Rewrite body and create title with one Structured Outputs request.
+        Returns None if the model doesn't support it or the answer can't be parsed
+        """
+        if not self._structured_outputs:
+            return None
+        try:
+            content = await self._chat_complete(
+                _STRUCTURED_SYSTEM_PROMPT,
+                create_structured_rewriting_from_url_prompt(url, max_symbols=max_symbols),
+                max_tokens=math.ceil((max_symbols + MAX_TITLE_LEN) / SYMBOLS_PER_TOKEN) + STRUCTURED_OUTPUT_EXTRA_TOKENS,
+                response_format=_news_response_format(max_symbols),
+                extra_body={"prompt_cache_key": _prompt_cache_key(self._model, "rewrite-structured")},
+            )
+            news = orjson.loads(content)
+            return news["body"], news["title"]
+        except openai.BadRequestError as e:
+            self._structured_outputs = False
+            logger.warning(f"Structured rewriting rejected by {self._model}, using separate requests from now on: {str(e)}")
+            return None
+        except Exception as e:
+            logger.warning(f"Structured rewriting failed, falling back to separate requests: {str(e)}")
+            return None
+
+    async def rewrite_text_from_url(
+        self,
+        url: str,
+        max_symbols: int = DEFAULT_REWRITE_MAX_SYMBOLS,
+        temperature: float | None = None,
+    ) -> str:
+        prompt = create_rewriting_from_url_prompt(url, max_symbols=max_symbols)
+        return await self._chat_complete(
+            _REWRITER_SYSTEM_PROMPT,
+            prompt,
+            temperature=temperature,
+            max_tokens=self._max_tokens,
+            extra_body={"prompt_cache_key": _prompt_cache_key(self._model, "rewrite")}
+        )
     
-    def rewrite_text(self, text: str) -> str:
+    async def rewrite_text(self, text: str) -> str:
         """
         Rewrite text using ChatGPT
         
@@ -54,66 +214,243 @@ class NewsRewriter:
         try:
             prompt = create_rewriting_prompt(text)
             
-            response = self.client.chat.completions.create(
-                model=settings.openai.MODEL,
-                messages=[
-                    {"role": "system", "content": "You are a professional content rewriter specializing in the 'Ghost on the block' style. STRICT OUTPUT LIMIT: 400 symbols."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=settings.openai.TEMPERATURE,
-                max_tokens=settings.openai.MAX_TOKENS
+            text = await self._chat_complete(
+                _REWRITER_SYSTEM_PROMPT,
+                prompt,
+                max_tokens=self._max_tokens,
+                extra_body={"prompt_cache_key": _prompt_cache_key(self._model, "rewrite-text")}
             )
             
-            text = response.choices[0].message.content
-            title = self.create_title(text)
+            title = await self.create_title(text)
             return format_news(news_text=text, news_title=title)
             
         except Exception as e:
             logger.error(f"Error in rewriting text: {str(e)}")
             return text  # Return original text if rewriting fails
 
-    def create_title(self, text: str) -> str:
+    async def create_title(self, text: str) -> str:
         try:
             prompt = create_title_prompt(text)
             
-            response = self.client.chat.completions.create(
-                model=settings.openai.MODEL,
-                messages=[
-                    {"role": "system", "content": "You are a professional caption creator specializing in the 'Ghost on the block' style. STRICT OUTPUT LIMIT: 77 symbols."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=settings.openai.TEMPERATURE,
-                max_tokens=settings.openai.MAX_TOKENS
+            title = await self._chat_complete(
+                _TITLE_SYSTEM_PROMPT,
+                prompt,
+                max_tokens=self._max_tokens,
+                extra_body={"prompt_cache_key": _prompt_cache_key(self._model, "title")}
             )
-            title = response.choices[0].message.content
-            # remove " if its on the sides
-            if title.startswith('"') and title.endswith('"'):
-                title = title[1:-1]
-            return title
+            # remove " and stray whitespace on the sides
+            return title.strip().strip('"').strip()
             
         except Exception as e:
             print(f"Error in writing title: {str(e)}")
             return ""  # Return empty string if title writing fails
 
+    async def rewrite_news_batch(
+        self,
+        news_urls: list[str],
+        max_news_text_len: int = 1000,
+        max_rewriting_tries: int = 3,
+        news_titles: list[str | None] | None = None,
+    ) -> list[str | BaseException]:
+        """
+        Rewrite several news with one request ("answer all of these").
+        Items the batch answer doesn't cover, or covers too long, are rewritten one by one with rewrite_news.
+        Returns formatted news in the order of news_urls, or the exception of an item that failed
+        """
+        news_titles = news_titles or [None] * len(news_urls)
+        results = await self._request_news_batch(news_urls, max_news_text_len)
+        return await _rewrite_missing(
+            results, self.rewrite_news, news_urls, news_titles, max_news_text_len, max_rewriting_tries
+        )
+
+    async def _request_news_batch(self, news_urls: list[str], max_news_text_len: int) -> list[str | None]:
+        """Batch request only, None for the items its answer doesn't cover or covers too long"""
+        results: list[str | None] = [None] * len(news_urls)
+        # a schema when the model takes one, plain JSON mode otherwise
+        structured = self._structured_outputs
+        try:
+            content = await self._chat_complete(
+                _BATCH_SYSTEM_PROMPT,
+                create_batch_rewriting_from_url_prompt(news_urls),
+                max_tokens=math.ceil(len(news_urls) * (DEFAULT_REWRITE_MAX_SYMBOLS + MAX_TITLE_LEN) / SYMBOLS_PER_TOKEN)
+                    + len(news_urls) * STRUCTURED_OUTPUT_EXTRA_TOKENS,
+                response_format=_batch_response_format(DEFAULT_REWRITE_MAX_SYMBOLS) if structured else {"type": "json_object"},
+                extra_body={"prompt_cache_key": _prompt_cache_key(self._model, "rewrite-batch")},
+            )
+            batch = orjson.loads(content)["news"]
+            for index, news in enumerate(batch[:len(news_urls)]):
+                title = news["title"][:MAX_TITLE_LEN]
+                formatted = format_news(news_text=news["body"], news_title=title)
+                if len(formatted) <= max_news_text_len:
+                    results[index] = formatted
+        except openai.BadRequestError as e:
+            if structured:
+                self._structured_outputs = False
+                logger.warning(f"Structured batch rewriting rejected by {self._model}, using JSON mode from now on: {str(e)}")
+            else:
+                logger.warning(f"Batch rewriting failed, falling back to separate requests: {str(e)}")
+        except Exception as e:
+            logger.warning(f"Batch rewriting failed, falling back to separate requests: {str(e)}")
+        return results
+
+    async def _chat_complete(self, system_prompt: str, prompt: str, temperature: float | None = None, **kwargs) -> str:
+        """Chat completion through the in-process response cache, identical requests within the TTL are answered from it"""
+        if temperature is None:
+            temperature = self._temperature
+        key = _response_cache_key(self._model, temperature, system_prompt, prompt, kwargs)
+        content = _response_cache.get(key)
+        if content is not None:
+            return content
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+        if self._service_tier == "flex":
+            try:
+                response = await self.client.chat.completions.create(
+                    model=self._model,
+                    messages=messages,
+                    temperature=temperature,
+                    service_tier="flex",
+                    timeout=FLEX_TIMEOUT,
+                    **kwargs
+                )
+            except openai.RateLimitError:
+                # no flex capacity right now, the scheduled job shouldn't be skipped for that
+                logger.warning("No flex capacity for OpenAI request, retrying with default tier")
+                response = await self.client.chat.completions.create(
+                    model=self._model, messages=messages, temperature=temperature, **kwargs
+                )
+        else:
+            if self._service_tier:
+                kwargs["service_tier"] = self._service_tier
+            response = await self.client.chat.completions.create(
+                model=self._model,
+                messages=messages,
+                temperature=temperature,
+                **kwargs
+            )
+        content = response.choices[0].message.content
+        _response_cache.put(key, content)
+        return content
+
+    async def close(self):
+        """Close OpenAI client connections"""
+        await self.client.close()
+
+
+_rewriter: NewsRewriter | None = None
+_rewrite_semaphore = asyncio.Semaphore(MAX_CONCURRENT_REWRITES)
+
+
+def get_rewriter() -> NewsRewriter:
+    """Get shared rewriter, so OpenAI requests reuse one connection pool"""
+    global _rewriter
+    if _rewriter is None:
+        _rewriter = NewsRewriter(settings.openai.API_KEY)
+    return _rewriter
+
+
+async def close_rewriter() -> None:
+    """Close shared rewriter"""
+    global _rewriter
+    if _rewriter is not None:
+        await _rewriter.close()
+        _rewriter = None
+
+
+async def rewrite_news(
+    news_url: str,
+    max_news_text_len: int = 1000,
+    max_rewriting_tries: int = 3,
+    news_title: str | None = None,
+) -> str:
+    """Rewrite news with the shared rewriter, see NewsRewriter.rewrite_news"""
+    async with _rewrite_semaphore:
+        return await get_rewriter().rewrite_news(
+            news_url,
+            max_news_text_len=max_news_text_len,
+            max_rewriting_tries=max_rewriting_tries,
+            news_title=news_title,
+        )
+
+
+async def rewrite_news_batch(
+    news_urls: list[str],
+    max_news_text_len: int = 1000,
+    max_rewriting_tries: int = 3,
+    news_titles: list[str | None] | None = None,
+) -> list[str | BaseException]:
+    """Rewrite several news with the shared rewriter, see NewsRewriter.rewrite_news_batch"""
+    news_titles = news_titles or [None] * len(news_urls)
+    async with _rewrite_semaphore:
+        results = await get_rewriter()._request_news_batch(news_urls, max_news_text_len)
+    # every fallback takes its own slot, so the batch can't go over MAX_CONCURRENT_REWRITES
+    return await _rewrite_missing(
+        results, rewrite_news, news_urls, news_titles, max_news_text_len, max_rewriting_tries
+    )
+
+
+async def _rewrite_missing(
+    results: list[str | None],
+    rewrite_one: Callable[..., Awaitable[str]],
+    news_urls: list[str],
+    news_titles: list[str | None],
+    max_news_text_len: int,
+    max_rewriting_tries: int,
+) -> list[str | BaseException]:
+    """Rewrite the items the batch answer left as None one by one with rewrite_one"""
+    missing = [index for index, news in enumerate(results) if news is None]
+    if missing:
+        fallback = await asyncio.gather(
+            *(
+                rewrite_one(
+                    news_urls[index],
+                    max_news_text_len=max_news_text_len,
+                    max_rewriting_tries=max_rewriting_tries,
+                    news_title=news_titles[index],
+                )
+                for index in missing
+            ),
+            return_exceptions=True,
+        )
+        for index, news in zip(missing, fallback):
+            results[index] = news
+    return results
+
+
+# Prompt templates are built once at import, only the source is substituted per call
+_EXAMPLES = """
+Example transformation:
+
+SOURCE: Planes – это новое приложение в котором награду дают за количество отправленных сообщений в телеге за время существования вашего аккаунта. Друзья, у меня 7591 сообщений, а у вас? Залетаем ✈️
+
+RESULT: ✈️ Planes — новое приложение с наградами за сообщения!
+Чем больше сообщений ты отправил в Telegram за всё время существования своего аккаунта, тем больше получишь награду.
+У меня уже 7591 сообщение, а у вас сколько? Давайте хвастаться! 😏
+Залетаем и считаем! ✈️
 
+Please rewrite the following text in the same style:
+"""
 
-def create_rewriting_from_url_prompt(url: str) -> str:
-    prompt = f"""
-Make a concise rewrite of the article from {url} in the “Ghost on the block” style. Omit mentioning the source, focus only on the most important points. Keep non-source links from the text intact. Limit the rewrite to 600 characters. Use conversational American English.
+# Everything constant goes first and the per-call input last, so requests share a prefix for OpenAI prompt caching
+_REWRITE_FROM_URL_PREFIX = """
+Make a concise rewrite of the article from the URL below in the “Ghost on the block” style. Omit mentioning the source, focus only on the most important points. Keep non-source links from the text intact. Use conversational American English.
 
 Required:
  • Short sentences.
  • Friendly tone.
  • Include external links present in the original article (except for the source link).
  • Highlight key details and provide a call to action.
-"""
-    
-    # prompt = f"Сделай краткий рерайт на английском языке данной статьи {url} в стиле ghost on the block без указания источника, только самые важные моменты, сохрани ссылки не на источник, до 1000 символов."
-    return add_examples_to_the_prompt(prompt)
+""" + _EXAMPLES
 
+_URL_INPUT_TEMPLATE = """
+Limit the rewrite to {max_symbols} characters.
 
-def create_rewriting_prompt(source_text):
-    prompt = f"""
+URL: {url}
+"""
+
+_REWRITE_PREFIX = """
 You are a professional content rewriter specializing in the "Ghost-on-the-block" style.
 STRICT LIMIT: 400 symbols max!
 IGNORE THIS LIMIT = FAIL THE TASK!
@@ -124,9 +461,6 @@ Required:
 - Call to action
 - Stay under 400 symbols!
 
-Here's the text to rewrite in the Ghost-on-the-block style:
-{source_text}
-
 Important style notes:
 - Start with a relevant emoji
 - Use shorter paragraphs
@@ -137,27 +471,14 @@ Important style notes:
 - Make it feel like a friendly conversation
 
 Please rewrite the text following these guidelines while maintaining the original meaning.
-"""
-    return add_examples_to_the_prompt(prompt)
-
-def add_examples_to_the_prompt(prompt: str):
-    examples = """
-Example transformation:
+""" + _EXAMPLES
 
-SOURCE: Planes – это новое приложение в котором награду дают за количество отправленных сообщений в телеге за время существования вашего аккаунта. Друзья, у меня 7591 сообщений, а у вас? Залетаем ✈️
-
-RESULT: ✈️ Planes — новое приложение с наградами за сообщения!
-Чем больше сообщений ты отправил в Telegram за всё время существования своего аккаунта, тем больше получишь награду.
-У меня уже 7591 сообщение, а у вас сколько? Давайте хвастаться! 😏
-Залетаем и считаем! ✈️
-
-Please rewrite the following text in the same style:
+_TEXT_INPUT_TEMPLATE = """
+INPUT:
+{source_text}
 """
-    return prompt + examples
-
 
-def create_title_prompt(source_text):
-    prompt = f"""
+_TITLE_TEMPLATE = """
 You are a professional caption creator specializing in the "Ghost-on-the-block" style.
 STRICT LIMIT: 77 symbols max!
 IGNORE THIS LIMIT = FAIL THE TASK!
@@ -171,15 +492,114 @@ Required:
 
 write caption for this news:
 {source_text}"""
-    return prompt
 
+_STRUCTURED_TITLE_INSTRUCTIONS = """
+Put the rewrite in "body". In "title" write a caption for it:
+- One short sentence
+- Stay under 77 symbols!
+- Use American English
+- No hashtags
+- Use emoji
+"""
 
-def format_news(news_text: str, news_title: str) -> str:
-    bottom_text = """
+_BATCH_INSTRUCTIONS = """
+Rewrite each of the articles from the URLs below this way. Return a JSON object {{"news": [...]}} with one
+{{"title": ..., "body": ...}} object per article, in the same order as the URLs. Put the rewrite in "body",
+limited to {max_symbols} characters. In "title" write a caption for it:
+- One short sentence
+- Stay under 77 symbols!
+- Use American English
+- No hashtags
+- Use emoji
+
+URLS:
+"""
+
+
+def create_rewriting_from_url_prompt(url: str, max_symbols: int = DEFAULT_REWRITE_MAX_SYMBOLS) -> str:
+    # prompt = f"Сделай краткий рерайт на английском языке данной статьи {url} в стиле ghost on the block без указания источника, только самые важные моменты, сохрани ссылки не на источник, до 1000 символов."
+    return _REWRITE_FROM_URL_PREFIX + _URL_INPUT_TEMPLATE.format(url=url, max_symbols=max_symbols)
+
+
+def create_structured_rewriting_from_url_prompt(url: str, max_symbols: int = DEFAULT_REWRITE_MAX_SYMBOLS) -> str:
+    return (
+        _REWRITE_FROM_URL_PREFIX
+        + _STRUCTURED_TITLE_INSTRUCTIONS
+        + _URL_INPUT_TEMPLATE.format(url=url, max_symbols=max_symbols)
+    )
+
+
+def create_batch_rewriting_from_url_prompt(urls: list[str], max_symbols: int = DEFAULT_REWRITE_MAX_SYMBOLS) -> str:
+    numbered_urls = "\n".join(f"{number}. {url}" for number, url in enumerate(urls, start=1))
+    return _REWRITE_FROM_URL_PREFIX + _BATCH_INSTRUCTIONS.format(max_symbols=max_symbols) + numbered_urls + "\n"
+
+
+def _prompt_cache_key(model: str, kind: str) -> str:
+    """Same key for requests sharing a prompt prefix, so OpenAI routes them to the same cache"""
+    return f"{model}:{kind}"
+
+
+def _news_schema(max_symbols: int) -> dict:
+    return {
+        "type": "object",
+        "properties": {
+            "body": {"type": "string", "maxLength": max_symbols},
+            "title": {"type": "string", "maxLength": MAX_TITLE_LEN},
+        },
+        "required": ["body", "title"],
+        "additionalProperties": False,
+    }
+
+
+def _news_response_format(max_symbols: int) -> dict:
+    """JSON schema of the structured answer, lengths are the same limits the prompts ask for"""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": "news", "schema": _news_schema(max_symbols)},
+    }
+
+
+def _batch_response_format(max_symbols: int) -> dict:
+    """JSON schema of the batch answer, a list of structured answers"""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "news_batch",
+            "schema": {
+                "type": "object",
+                "properties": {"news": {"type": "array", "items": _news_schema(max_symbols)}},
+                "required": ["news"],
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+def create_rewriting_prompt(source_text):
+    return _REWRITE_PREFIX + _TEXT_INPUT_TEMPLATE.format(source_text=source_text)
+
+
+def create_title_prompt(source_text):
+    return _TITLE_TEMPLATE.format(source_text=source_text)
+
+
+_BOTTOM_TEXT = """
 #quests_news"""
-    news_text = convert_md_links_to_html(news_text)
-    text = f"<b>{news_title.upper()}</b>\n\n{news_text}\n{bottom_text}"
-    return text
+
+_NEWS_TEMPLATE = "<b>{title}</b>\n\n{body}\n" + _BOTTOM_TEXT
+
+
+def format_news(news_text: str, news_title: str) -> str:
+    return _NEWS_TEMPLATE.format(title=news_title.upper(), body=convert_md_links_to_html(news_text))
+
+
+# Pattern to match Markdown links: [text](url)
+_MD_LINK_RE = re.compile(r'\[(.*?)\]\((.*?)\)')
+
+
+def _md_link_to_html(match: re.Match) -> str:
+    text, url = match.groups()
+    return f'<a href="{url}">{text}</a>'
 
 
 def convert_md_links_to_html(text: str) -> str:
@@ -197,16 +617,7 @@ def convert_md_links_to_html(text: str) -> str:
         >>> convert_md_links_to_html(text)
         'Check <a href="https://example.com">this link</a>'
     """
-    
-    # Pattern to match Markdown links: [text](url)
-    pattern = r'\[(.*?)\]\((.*?)\)'
-    
-    # Replace each match with HTML format
-    def replace_link(match):
-        text, url = match.groups()
-        return f'<a href="{url}">{text}</a>'
-    
-    return re.sub(pattern, replace_link, text)
+    return _MD_LINK_RE.sub(_md_link_to_html, text)
 
 
 
@@ -1,6 +1,9 @@
 from PIL import Image
+import io
 import os
 
+REDUCING_GAP = 2.0
+
 def convert_and_resize_image(input_path, output_path, size=(800, 600), quality=85):
     """
     Convert an image to JPG format and resize it.
@@ -11,18 +14,46 @@ def convert_and_resize_image(input_path, output_path, size=(800, 600), quality=8
         size (tuple): Desired output size in pixels (width, height)
         quality (int): JPEG quality (1-95, higher is better quality but larger file)
     """
+    return _convert_and_resize(input_path, output_path, size, quality)
+
+def convert_and_resize_to_bytes(data: bytes, size=(800, 600), quality=85) -> bytes | None:
+    """
+    Convert an in-memory image (e.g. HTTP response body) to JPG format and resize it,
+    entirely in memory: neither the source nor the result touches the disk.
+    
+    Args:
+        data (bytes): Encoded source image
+        size (tuple): Desired output size in pixels (width, height)
+        quality (int): JPEG quality (1-95, higher is better quality but larger file)
+    
+    Returns:
+        bytes | None: Encoded JPEG or None if the image could not be processed
+    """
+    output = io.BytesIO()
+    if _convert_and_resize(io.BytesIO(data), output, size, quality) is None:
+        return None
+    return output.getvalue()
+
+def _convert_and_resize(source, output_path, size, quality):
     try:
         # Open the image
-        with Image.open(input_path) as img:
-            # Convert to RGB if necessary (e.g., if image is RGBA/PNG)
-            if img.mode in ('RGBA', 'LA'):
+        with Image.open(source) as img:
+            if img.format == 'JPEG':
+                # Let libjpeg decode at the smallest 1/2, 1/4, 1/8 DCT scale that still covers
+                # REDUCING_GAP * size, the final LANCZOS pass then only has that much to filter
+                img.draft('RGB', (int(size[0] * REDUCING_GAP), int(size[1] * REDUCING_GAP)))
+
+            # Resample in RGB (grayscale stays L): palette images are otherwise
+            # resized with NEAREST, and RGBA/LA/CMYK/P can't be saved as JPEG at all
+            if img.mode not in ('RGB', 'L'):
                 img = img.convert('RGB')
             
-            # Resize the image maintaining aspect ratio
-            img.thumbnail(size, Image.Resampling.LANCZOS)
+            # Resize the image maintaining aspect ratio. reducing_gap does a cheap
+            # integer reduce() first, so LANCZOS only runs on a ~2x larger image
+            img.thumbnail(size, Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
             
             # Save as JPEG
-            img.save(output_path, 'JPEG', quality=quality, optimize=True)
+            img.save(output_path, 'JPEG', quality=quality, optimize=True, progressive=True)
             
         return output_path
         
@@ -0,0 +1,32 @@
+import asyncio
+from collections import deque
+
+
+class RateLimiter:
+    """Async sliding-window limiter: at most `max_rate` acquisitions per `time_period` seconds."""
+
+    def __init__(self, max_rate: int, time_period: float = 1.0):
+        self.max_rate = max_rate
+        self.time_period = time_period
+        self._timestamps: deque[float] = deque()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a slot is free in the current window and take it."""
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                while self._timestamps and now - self._timestamps[0] >= self.time_period:
+                    self._timestamps.popleft()
+                if len(self._timestamps) < self.max_rate:
+                    self._timestamps.append(now)
+                    return
+                await asyncio.sleep(self.time_period - (now - self._timestamps[0]))
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
@@ -1,46 +1,16 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_MISSED
+from datetime import datetime
 from typing import Callable, Any
 import pytz
 import logging
-import asyncio
-from functools import wraps
 
 from app.core.config import settings
 
 logger = logging.getLogger(settings.LOGGER_NAME)
 
-def create_async_job_wrapper(async_func: Callable) -> Callable:
-    """
-    Creates a wrapper for async functions to work with APScheduler.
-    Ensures proper coroutine execution in the thread pool executor.
-    """
-    @wraps(async_func)
-    def job_wrapper(**kwargs):
-        try:
-            # Get or create event loop
-            try:
-                loop = asyncio.get_event_loop()
-            except RuntimeError:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-            
-            # Create future to run in the background
-            future = asyncio.run_coroutine_threadsafe(
-                async_func(**kwargs),
-                loop
-            )
-            
-            # Wait for the result
-            return future.result()
-            
-        except Exception as e:
-            logger.error(f"Error in async job {async_func.__name__}: {str(e)}")
-            raise
-    
-    return job_wrapper
+MISFIRE_GRACE_TIME = 300
 
 class SchedulerManager:
     """Manages scheduling of jobs using APScheduler."""
@@ -51,10 +21,8 @@ class SchedulerManager:
         self._configure_scheduler()
 
     def _configure_scheduler(self) -> None:
-        """Configure the APScheduler with SQLAlchemy job store and thread pool executor."""
+        """Configure the APScheduler. Jobs are coroutine functions, AsyncIOScheduler awaits them on the running loop."""
         try:
-            
-
             self.scheduler = AsyncIOScheduler(
                 timezone=pytz.UTC
             )
@@ -104,8 +72,6 @@ class SchedulerManager:
                 jitter=30  # Add small random delay to prevent concurrent executions
             )
 
-            # wrapped_job = create_async_job_wrapper(job_func)
-
             # Add the job
             self.scheduler.add_job(
                 func=job_func,
@@ -113,6 +79,8 @@ class SchedulerManager:
                 id=job_id,
                 kwargs=kwargs,
                 replace_existing=True,
+                # jobs sharing a time run side by side, don't drop one that starts a bit late
+                misfire_grace_time=MISFIRE_GRACE_TIME,
                 name=f"Job {job_id} at {hours:02d}:{minutes:02d} UTC"
             )
             
@@ -164,6 +132,13 @@ class SchedulerManager:
         """Get all scheduled jobs."""
         return self.scheduler.get_jobs() if self.scheduler else []
 
+    def get_next_run_time(self) -> datetime | None:
+        """Get the earliest next run time over all jobs, None if nothing is scheduled."""
+        return min(
+            (job.next_run_time for job in self.get_jobs() if job.next_run_time),
+            default=None
+        )
+
     def get_jobs_report(self) -> str:
         """Get a formatted report of all scheduled jobs."""
         if not self.scheduler:
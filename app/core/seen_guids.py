@@ -0,0 +1,59 @@
+import os
+import logging
+from collections import deque
+from pathlib import Path
+
+import orjson
+
+from app.core.config import settings
+
+logger = logging.getLogger(settings.LOGGER_NAME)
+
+SEEN_GUIDS_MAX = 1024
+
+
+class SeenGuids:
+    """Guids of the last published news, kept on disk so an item is never rewritten and posted twice."""
+
+    def __init__(self, path: Path, maxlen: int = SEEN_GUIDS_MAX):
+        self.path = path
+        self._order: deque[str] = deque(maxlen=maxlen)
+        # same guids as _order, for O(1) membership checks
+        self._guids: set[str] = set()
+
+    def __contains__(self, guid: str) -> bool:
+        return guid in self._guids
+
+    def add(self, guid: str) -> None:
+        """Remember guid, the oldest one is forgotten once maxlen is reached."""
+        if not guid or guid in self._guids:
+            return
+        if len(self._order) == self._order.maxlen:
+            self._guids.discard(self._order[0])
+        self._order.append(guid)
+        self._guids.add(guid)
+
+    def load(self) -> None:
+        """Load guids saved by a previous run, a missing file means nothing was published yet."""
+        try:
+            for guid in orjson.loads(self.path.read_bytes()):
+                self.add(guid)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Error reading seen guids: {str(e)}")
+
+    def dumps(self) -> bytes:
+        """Serialize guids, a snapshot that save() can write from another thread."""
+        return orjson.dumps(list(self._order))
+
+    def save(self, data: bytes | None = None) -> None:
+        """Save guids atomically: write a temp file, then replace the old one. data defaults to dumps()."""
+        try:
+            if data is None:
+                data = self.dumps()
+            tmp_file = self.path.with_name(f"{self.path.name}.tmp")
+            tmp_file.write_bytes(data)
+            os.replace(tmp_file, self.path)
+        except Exception as e:
+            logger.error(f"Failed to save seen guids: {str(e)}")
@@ -1,32 +1,60 @@
+import asyncio
+import heapq
+import sys
 from dataclasses import dataclass
+from functools import lru_cache
 import datetime as dt
-from datetime import timezone, timedelta
-from typing import List, Optional
+from typing import Container, List, Optional
 import httpx
 from httpx import HTTPError
-import xml.etree.ElementTree as ET
+from io import BytesIO
+from lxml import etree
 from pathlib import Path
 import logging
 
 from app.core.config import settings
 from app.core.models import NewsItem
+from app.core.sources.common import DATE_CACHE_SIZE, get_age_threshold, is_too_old, parse_feed_date, parse_rfc822
 
 logger = logging.getLogger(settings.LOGGER_NAME)
 
-@dataclass
+FEED_TIMEOUT = httpx.Timeout(30.0)
+FEED_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16)
+FEED_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+NAMESPACES = {
+    'media': 'http://search.yahoo.com/mrss/',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+    'content': 'http://purl.org/rss/1.0/modules/content/',
+}
+MEDIA_CONTENT = f"{{{NAMESPACES['media']}}}content"
+MEDIA_THUMBNAIL = f"{{{NAMESPACES['media']}}}thumbnail"
+MEDIA_GROUP = f"{{{NAMESPACES['media']}}}group"
+DC_CREATOR = f"{{{NAMESPACES['dc']}}}creator"
+CONTENT_ENCODED = f"{{{NAMESPACES['content']}}}encoded"
+# item children read as text by _parse_item
+ITEM_TEXT_TAGS = frozenset({'title', 'link', 'pubDate', 'description', 'guid', DC_CREATOR, CONTENT_ENCODED})
+
+_client: httpx.AsyncClient | None = None
+# feed url -> (etag, last-modified, body, parsed feed by category filter) of the last full response,
+# one conditional GET state per url shared by every category polling it
+_feed_cache: dict[str, tuple[str | None, str | None, bytes, dict[str | None, "Feed"]]] = {}
+
+
+@dataclass(slots=True)
 class FeedItem:
     """Data class to store RSS feed item information."""
     title: str
     link: str
     creator: Optional[str]
     pub_date: dt.datetime
-    categories: List[str]
+    categories: frozenset[str]
     description: str
     content: str
     media_url: Optional[str]
     guid: str
 
-@dataclass
+@dataclass(slots=True)
 class FeedMetadata:
     """Data class to store RSS feed metadata."""
     title: str
@@ -36,7 +64,7 @@ class FeedMetadata:
     last_build_date: dt.datetime
     image_url: Optional[str]
 
-@dataclass
+@dataclass(slots=True)
 class Feed:
     """Data class to represent complete RSS feed."""
     metadata: FeedMetadata
@@ -44,13 +72,14 @@ class Feed:
 
 
 class FeedReader:
-    def get_latest_news_by_category(
+    async def get_latest_news_by_category(
         self,
         feed_url: str,
         target_category: str | None = None,
         max_news_count: int = 1,
         prev_published: dt.datetime | None = None,
-        tmp_dir: Path = None
+        tmp_dir: Path = None,
+        seen_guids: Container[str] | None = None
     ) -> list[NewsItem]:
         """
         Get the latest news for each specified category.
@@ -60,61 +89,113 @@ class FeedReader:
             target_categories: List of categories to filter
             prev_published: Dictionary of previously published dates by category
             tmp_dir: Path to temporary directory for storing state
+            seen_guids: Guids of already published news, skipped
         
         Returns:
             List of latest news items sorted by publication date
         """
-        tmp_dir = tmp_dir or Path(settings.TMP_DIR)
-        target_category = target_category.lower()
+        # casefold is lower() made Unicode-complete, used on both sides of the match
+        target_category = sys.intern(target_category.casefold()) if target_category else None
         
         category_news: list[NewsItem] = []
         try:
-            feed = fetch_rss_feed(feed_url)
+            feed = await fetch_rss_feed(feed_url, target_category=target_category)
 
+            # same cut-off for every entry of this poll
+            threshold = get_age_threshold()
+            previous_date = None
             for entry in feed.items:
-                if _is_too_old(entry.pub_date, prev_published):
+                if previous_date is not None and entry.pub_date > previous_date:
+                    logger.debug(f"{feed_url} is not newest first, consider FEEDS_ASSUME_CHRONOLOGICAL=false")
+                previous_date = entry.pub_date
+
+                if is_too_old(entry.pub_date, prev_published, threshold):
+                    if settings.FEEDS_ASSUME_CHRONOLOGICAL:
+                        # the rest of the feed is older still
+                        break
                     continue
                 
                 if target_category and target_category not in entry.categories:
                     continue
+
+                if seen_guids and (entry.guid or entry.link) in seen_guids:
+                    continue
                 
                 news_item = _create_news_item(entry, target_category)
                 category_news.append(news_item)
         except Exception as e:
             logger.error(f"Error processing feed {feed_url}: {str(e)}")
 
-        # Sort and limit results
-        return sorted(category_news, key=lambda x: x.published_at, reverse=True)[:max_news_count]
+        # Sort and limit results, only the newest max_news_count are kept
+        return heapq.nlargest(max_news_count, category_news, key=lambda x: x.published_at)
+
+
+def get_client() -> httpx.AsyncClient:
+    """Get shared async HTTP client, so feed polls reuse pooled keep-alive connections"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=FEED_TIMEOUT,
+            limits=FEED_LIMITS,
+            follow_redirects=True,
+            # mimic a browser request
+            headers={'User-Agent': FEED_USER_AGENT},
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Close shared async HTTP client"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
 
 
-def fetch_rss_feed(url: str, timeout: float = 30.0) -> Optional[Feed]:
+async def fetch_rss_feed(url: str, timeout: float = 30.0, target_category: str | None = None) -> Optional[Feed]:
     """
-    Fetch and parse RSS feed from URL using httpx.
+    Fetch and parse RSS feed from URL with the shared httpx client.
+    Sends a conditional GET, an unchanged feed (304) returns the previously parsed result,
+    a category seeing that body for the first time parses the cached body.
     
     Args:
         url (str): URL of the RSS feed
         timeout (float): Request timeout in seconds
+        target_category (str | None): Casefolded category, items without it are not built
         
     Returns:
         Optional[Feed]: Parsed feed data or None if fetching/parsing fails
     """
     try:
-        # Set up headers to mimic a browser request
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        # Create httpx client with timeout
-        timeout_config = httpx.Timeout(timeout)
+        headers = {}
+        cached = _feed_cache.get(url)
+        if cached:
+            etag, modified, _, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if modified:
+                headers['If-Modified-Since'] = modified
+
+        # Fetch the feed
+        response = await get_client().get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and cached:
+            _, _, content, parsed = cached
+            feed = parsed.get(target_category)
+            if feed is None:
+                feed = parse_rss_feed(content, target_category)
+                if feed is not None:
+                    parsed[target_category] = feed
+            return feed
+        response.raise_for_status()
         
-        # Use context manager for proper resource cleanup
-        with httpx.Client(timeout=timeout_config, follow_redirects=True) as client:
-            # Fetch the feed
-            response = client.get(url, headers=headers)
-            response.raise_for_status()
-            
-            # Parse the feed
-            return parse_rss_feed(response.text)
+        # Parse the feed, lxml reads the encoding from the XML declaration
+        content = response.content
+        feed = parse_rss_feed(content, target_category)
+        if feed is not None:
+            _feed_cache[url] = (
+                response.headers.get('etag'), response.headers.get('last-modified'), content, {target_category: feed}
+            )
+        return feed
         
     except HTTPError as e:
         logger.error(f"Failed to fetch feed from {url}: {e}")
@@ -126,96 +207,140 @@ def fetch_rss_feed(url: str, timeout: float = 30.0) -> Optional[Feed]:
 def parse_date(date_str: str) -> dt.datetime:
     """Parse RSS date string to datetime object."""
     try:
-        return dt.datetime.strptime(date_str, "%a, %d %b %Y %H:%M:%S %z")
+        return _parse_rss_date(date_str)
     except ValueError as e:
         logger.error(f"Failed to parse date: {date_str}. Error: {e}")
-        return dt.datetime.now()
+        # aware like every parsed date, a naive one would break the age comparisons
+        return dt.datetime.now(dt.timezone.utc)
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_rss_date(date_str: str) -> dt.datetime:
+    """Slice parser for the RFC 822 layout the feed uses, then strptime, other formats go to the shared dateutil-based parser"""
+    try:
+        return parse_rfc822(date_str)
+    except ValueError:
+        pass
+    try:
+        return dt.datetime.strptime(date_str, "%a, %d %b %Y %H:%M:%S %z")
+    except ValueError:
+        return parse_feed_date(date_str)
 
-def parse_rss_feed(xml_content: str) -> Optional[Feed]:
+
+def parse_rss_feed(xml_content: str | bytes, target_category: str | None = None) -> Optional[Feed]:
     """
     Parse RSS feed XML content and return structured data.
+    Items are built incrementally as each </item> is parsed and cleared right after,
+    so the tree never holds all item bodies at once.
     
     Args:
-        xml_content (str): Raw XML content of the RSS feed
+        xml_content (str | bytes): Raw XML content of the RSS feed, preferably bytes
+        target_category (str | None): Casefolded category, items without it are skipped before their fields are read
         
     Returns:
         Optional[Feed]: Parsed feed data or None if parsing fails
     """
     try:
-        # Parse XML
-        root = ET.fromstring(xml_content)
-        channel = root.find('channel')
+        if isinstance(xml_content, str):
+            xml_content = xml_content.encode()
+        context = etree.iterparse(BytesIO(xml_content), events=('end',), tag='item', huge_tree=False)
+
+        # Parse items
+        items = []
+        channel = None
+        for _, item_elem in context:
+            if channel is None:
+                channel = item_elem.getparent()
+            item = _parse_item(item_elem, target_category)
+            if item is not None:
+                items.append(item)
+            # item content is copied into FeedItem, free its subtree and the already handled items
+            item_elem.clear(keep_tail=True)
+            previous = item_elem.getprevious()
+            if previous is not None and previous.tag == 'item':
+                channel.remove(previous)
+
+        if channel is None:
+            channel = context.root.find('channel') if context.root is not None else None
         if channel is None:
             logger.error("No channel element found in RSS feed")
             return None
 
         # Parse feed metadata
+        image_url = channel.findtext('image/url')
         metadata = FeedMetadata(
             title=channel.findtext('title', ''),
             link=channel.findtext('link', ''),
             description=channel.findtext('description', ''),
             language=channel.findtext('language', 'en'),
             last_build_date=parse_date(channel.findtext('lastBuildDate', '')),
-            image_url=channel.find('.//image/url').text if channel.find('.//image/url') is not None else None
+            image_url=image_url
         )
 
-        # Parse items
-        items = []
-        for item_elem in channel.findall('item'):
-            # Extract media URL
-            media_content = item_elem.find('.//{http://search.yahoo.com/mrss/}content')
-            media_url = media_content.get('url') if media_content is not None else None
-            
-            if not media_url:
-                media_thumbnail = item_elem.find('.//{http://search.yahoo.com/mrss/}thumbnail')
-                media_url = media_thumbnail.get('url') if media_thumbnail is not None else None
-
-            # Extract categories
-            categories = [cat.text.lower() for cat in item_elem.findall('category') if cat.text]
-
-            # Create FeedItem
-            item = FeedItem(
-                title=item_elem.findtext('title', '').strip(),
-                link=item_elem.findtext('link', '').strip(),
-                creator=item_elem.findtext('.//{http://purl.org/dc/elements/1.1/}creator', '').strip(),
-                pub_date=parse_date(item_elem.findtext('pubDate', '')),
-                categories=categories,
-                description=item_elem.findtext('description', '').strip(),
-                content=item_elem.findtext('.//{http://purl.org/rss/1.0/modules/content/}encoded', '').strip(),
-                media_url=media_url,
-                guid=item_elem.findtext('guid', '').strip()
-            )
-            items.append(item)
-
         return Feed(metadata=metadata, items=items)
 
-    except ET.ParseError as e:
+    except etree.XMLSyntaxError as e:
         logger.error(f"Failed to parse XML: {e}")
         return None
     except Exception as e:
         logger.error(f"Unexpected error while parsing feed: {e}")
         return None
-    
-def _is_too_old(pub_date: dt.datetime, prev_published: dt.datetime | None, timedelta_days: int=1) -> bool:
-    """
-    Check if the publication date is older than 1 day.
-    Ensures timezone-aware comparison.
-    """
-    threshold = dt.datetime.now(timezone.utc) - timedelta(days=timedelta_days)
-    if pub_date < threshold:
-        return True
-    return pub_date <= prev_published if prev_published else False
 
 
+def _parse_item(item_elem, target_category: str | None = None) -> FeedItem | None:
+    # One walk over the item children, the first occurrence of a text field wins like findtext
+    texts: dict[str, str] = {}
+    categories = []
+    media_content_url = media_thumbnail_url = None
+    for child in item_elem:
+        tag = child.tag
+        if tag == 'category':
+            if child.text:
+                # every item shares a handful of categories, interned strings compare by identity
+                categories.append(sys.intern(child.text.strip().casefold()))
+        elif tag in ITEM_TEXT_TAGS:
+            if tag not in texts:
+                texts[tag] = child.text or ''
+        elif tag == MEDIA_CONTENT:
+            media_content_url = media_content_url or child.get('url')
+        elif tag == MEDIA_THUMBNAIL:
+            media_thumbnail_url = media_thumbnail_url or child.get('url')
+        elif tag == MEDIA_GROUP:
+            # renditions wrapped in <media:group>, same first-in-document-order pick as the direct ones
+            for rendition in child:
+                if rendition.tag == MEDIA_CONTENT:
+                    media_content_url = media_content_url or rendition.get('url')
+                elif rendition.tag == MEDIA_THUMBNAIL:
+                    media_thumbnail_url = media_thumbnail_url or rendition.get('url')
+
+    # items of other categories are dropped before their fields are stripped and the date is parsed
+    categories = frozenset(categories)
+    if target_category and target_category not in categories:
+        return None
+
+    # Create FeedItem
+    return FeedItem(
+        title=texts.get('title', '').strip(),
+        link=texts.get('link', '').strip(),
+        creator=texts.get(DC_CREATOR, '').strip(),
+        pub_date=parse_date(texts.get('pubDate', '')),
+        categories=categories,
+        description=texts.get('description', '').strip(),
+        content=texts.get(CONTENT_ENCODED, '').strip(),
+        media_url=media_content_url or media_thumbnail_url,
+        guid=texts.get('guid', '').strip()
+    )
+    
 def _create_news_item(item: FeedItem, category: str) -> NewsItem:
-    return NewsItem(
+    # FeedItem fields are already typed by parse_rss_feed, no need to validate them again
+    return NewsItem.model_construct(
         title=item.title,
         link=item.link,
         published_at=item.pub_date,
         source=item.creator,
         category=category,
         summary=item.description,
-        img_link=item.media_url
+        img_link=item.media_url,
+        guid=item.guid or item.link
     )
 
 
@@ -254,11 +379,11 @@ if __name__ == "__main__":
     #     for item in feed.items[:3]:  # Show first 3 items
     #         print(format_feed_item(item))
     feed_reader = FeedReader()
-    news = feed_reader.get_latest_news_by_category(
+    news = asyncio.run(feed_reader.get_latest_news_by_category(
         feed_url=feed_url,
         target_category="Press Releases",
         max_news_count=3
-    )
+    ))
 
     for item in news:
         print(format_feed_item(item))
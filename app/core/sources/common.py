@@ -0,0 +1,110 @@
+import datetime as dt
+from datetime import timezone, timedelta
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+
+from dateutil import parser, tz
+
+MAX_NEWS_AGE = timedelta(days=1)
+DATE_CACHE_SIZE = 4096
+
+# one parser instance, dateutil builds its lookup tables per instance
+_date_parser = parser.parser()
+# zone abbreviations feeds use instead of offsets, dateutil can't resolve them on its own
+_TZ_ABBREVIATIONS = {
+    'UTC': 'UTC', 'GMT': 'UTC', 'Z': 'UTC',
+    'EST': 'America/New_York', 'EDT': 'America/New_York',
+    'CST': 'America/Chicago', 'CDT': 'America/Chicago',
+    'MST': 'America/Denver', 'MDT': 'America/Denver',
+    'PST': 'America/Los_Angeles', 'PDT': 'America/Los_Angeles',
+}
+TZINFOS = {
+    name: zone
+    for name, zone in ((name, tz.gettz(zone_name)) for name, zone_name in _TZ_ABBREVIATIONS.items())
+    if zone is not None
+}
+
+
+MONTHS = {
+    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12,
+}
+# offset in minutes -> tzinfo, feeds use one or two offsets
+_offsets: dict[int, timezone] = {0: timezone.utc}
+
+
+def parse_rfc822(value: str) -> dt.datetime:
+    """
+    Slice-and-int parser for the fixed layout RSS feeds emit: 'Mon, 01 Jan 2024 13:45:00 +0000' or '... GMT'.
+    Raises ValueError on anything else, callers fall back to a general parser
+    """
+    if len(value) not in (29, 31) or value[3:5] != ', ' or value[16] != ' ' or value[25] != ' ':
+        raise ValueError(f"Not a fixed layout RFC 822 date: {value}")
+    zone = value[26:]
+    if zone == 'GMT':
+        offset = 0
+    elif len(zone) == 5 and zone[0] in '+-':
+        offset = int(zone[1:3]) * 60 + int(zone[3:5])
+        if zone[0] == '-':
+            offset = -offset
+    else:
+        raise ValueError(f"Not a fixed layout RFC 822 date: {value}")
+    tzinfo = _offsets.get(offset)
+    if tzinfo is None:
+        tzinfo = _offsets.setdefault(offset, timezone(timedelta(minutes=offset)))
+    try:
+        month = MONTHS[value[8:11]]
+    except KeyError:
+        raise ValueError(f"Unknown month in date: {value}") from None
+    return dt.datetime(
+        int(value[12:16]), month, int(value[5:7]),
+        int(value[17:19]), int(value[20:22]), int(value[23:25]),
+        tzinfo=tzinfo,
+    )
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_feed_date(value: str) -> dt.datetime:
+    """
+    Parse a feed date string into a timezone-aware datetime, naive dates are taken as UTC.
+    RSS pubDate is RFC 822 and Atom dates are RFC 3339, both have fast stdlib parsers; dateutil is the fallback.
+    Results are cached, feeds repeat the same dates between polls. Raises ValueError if the date can't be parsed
+    """
+    date = _parse_date(value)
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date
+
+
+def _parse_date(value: str) -> dt.datetime:
+    try:
+        return parse_rfc822(value)
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return dt.datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    try:
+        return _date_parser.parse(value, tzinfos=TZINFOS)
+    except OverflowError as e:
+        raise ValueError(f"Date out of range: {value}") from e
+
+
+def get_age_threshold(max_age: timedelta = MAX_NEWS_AGE) -> dt.datetime:
+    """Oldest publication date still worth posting, computed once per poll"""
+    return dt.datetime.now(timezone.utc) - max_age
+
+
+def is_too_old(pub_date: dt.datetime, prev_published: dt.datetime | None, threshold: dt.datetime) -> bool:
+    """
+    Check if the publication date is older than threshold (see get_age_threshold)
+    or not newer than the last published news. Both are timezone-aware datetime comparisons.
+    """
+    if pub_date < threshold:
+        return True
+    return prev_published is not None and pub_date <= prev_published
@@ -1,26 +1,189 @@
+import asyncio
+import heapq
 import logging
+import sys
 import datetime as dt
-from datetime import timezone, timedelta
+from dataclasses import dataclass
+from datetime import timezone
 from pathlib import Path
+from typing import Container
 
-import feedparser
-from dateutil import parser
+import httpx
+from lxml import etree
 
 from app.core.config import settings
 from app.core.models import NewsItem
+from app.core.sources.common import get_age_threshold, is_too_old, parse_feed_date
 
 logger = logging.getLogger(__name__)
 
+FEED_TIMEOUT = httpx.Timeout(30.0)
+FEED_LIMITS = httpx.Limits(max_connections=20)
+FEED_CHUNK_SIZE = 64 * 1024
+NAMESPACES = {
+    'atom': 'http://www.w3.org/2005/Atom',
+    'media': 'http://search.yahoo.com/mrss/',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+}
+ATOM_FEED = f"{{{NAMESPACES['atom']}}}feed"
+ATOM_ENTRY = f"{{{NAMESPACES['atom']}}}entry"
+ATOM_TITLE = f"{{{NAMESPACES['atom']}}}title"
+# FeedEntry date fields, most relevant first
+_DATE_FIELDS = ('published', 'updated', 'created')
+
+
+@dataclass(slots=True)
+class FeedEntry:
+    """Fields of an RSS item / Atom entry the reader needs"""
+    title: str
+    link: str
+    categories: frozenset[str] = frozenset()
+    published: str | None = None
+    updated: str | None = None
+    created: str | None = None
+    summary: str = ''
+    media_thumbnail: str | None = None
+    guid: str = ''
+
+
+@dataclass(slots=True)
+class ParsedFeed:
+    title: str
+    entries: list[FeedEntry]
+
+
+_client: httpx.AsyncClient | None = None
+# feed url -> (etag, last-modified, parsed feed) of the last full response
+_feed_cache: dict[str, tuple[str | None, str | None, ParsedFeed]] = {}
+# feed url -> fetch currently running for it
+_inflight_fetches: dict[str, asyncio.Task] = {}
+
+
+def get_client() -> httpx.AsyncClient:
+    """Get shared async HTTP client, so feed polls reuse the connection"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=FEED_TIMEOUT, limits=FEED_LIMITS, follow_redirects=True)
+    return _client
+
+
+async def close_client() -> None:
+    """Close shared async HTTP client"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def fetch_feed(feed_url: str) -> ParsedFeed:
+    """
+    Download feed with the shared client and parse it.
+    Jobs of several categories polling the same feed at once share one request
+    """
+    task = _inflight_fetches.get(feed_url)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_feed(feed_url))
+        _inflight_fetches[feed_url] = task
+        task.add_done_callback(lambda _: _inflight_fetches.pop(feed_url, None))
+    # a cancelled job must not cancel the fetch other jobs are waiting for
+    return await asyncio.shield(task)
+
+
+async def _fetch_feed(feed_url: str) -> ParsedFeed:
+    """Sends a conditional GET, an unchanged feed (304) returns the previously parsed result"""
+    headers = {}
+    cached = _feed_cache.get(feed_url)
+    if cached:
+        etag, modified, _ = cached
+        if etag:
+            headers['If-None-Match'] = etag
+        if modified:
+            headers['If-Modified-Since'] = modified
+
+    async with get_client().stream('GET', feed_url, headers=headers) as response:
+        if response.status_code == 304 and cached:
+            return cached[2]
+        response.raise_for_status()
+        feed = await _parse_feed_stream(response)
+
+    _feed_cache[feed_url] = (response.headers.get('etag'), response.headers.get('last-modified'), feed)
+    return feed
+
+
+async def _parse_feed_stream(response: httpx.Response) -> ParsedFeed:
+    """
+    Parse RSS 2.0 or Atom incrementally while it downloads, every item/entry is turned into a FeedEntry
+    and dropped from the tree, so memory follows one entry instead of the whole feed.
+    Raises ValueError if the document is not a feed
+    """
+    parser = etree.XMLPullParser(events=('end',), recover=True)
+    title = ''
+    entries = []
+    async for chunk in response.aiter_bytes(FEED_CHUNK_SIZE):
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            if element.tag == 'item':
+                entries.append(_parse_rss_item(element))
+            elif element.tag == ATOM_ENTRY:
+                entries.append(_parse_atom_entry(element))
+            else:
+                parent = element.getparent()
+                if element.tag in ('title', ATOM_TITLE) and parent is not None and parent.tag in ('channel', ATOM_FEED):
+                    title = (element.text or '').strip()
+                continue
+            element.clear()
+            # cleared entries still hang on the channel/feed, drop them too
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+    root = parser.close()
+    if root is None:
+        raise ValueError("Empty feed document")
+    if not entries and root.tag not in ('rss', ATOM_FEED):
+        raise ValueError(f"Unknown feed format: {root.tag}")
+    return ParsedFeed(title=title, entries=entries)
+
+
+def _parse_rss_item(item) -> FeedEntry:
+    thumbnail = item.xpath('media:thumbnail/@url', namespaces=NAMESPACES)
+    return FeedEntry(
+        title=(item.findtext('title') or '').strip(),
+        link=(item.findtext('link') or '').strip(),
+        # every entry shares a handful of categories, interned strings compare by identity
+        categories=frozenset(sys.intern(category.strip().casefold()) for category in item.xpath('category/text()')),
+        published=item.findtext('pubDate'),
+        created=item.findtext('dc:date', namespaces=NAMESPACES),
+        summary=item.findtext('description') or '',
+        media_thumbnail=thumbnail[0] if thumbnail else None,
+        guid=(item.findtext('guid') or '').strip(),
+    )
+
+
+def _parse_atom_entry(entry) -> FeedEntry:
+    links = entry.xpath('atom:link[not(@rel) or @rel="alternate"]/@href', namespaces=NAMESPACES)
+    thumbnail = entry.xpath('media:thumbnail/@url', namespaces=NAMESPACES)
+    return FeedEntry(
+        title=(entry.findtext('atom:title', namespaces=NAMESPACES) or '').strip(),
+        link=links[0] if links else '',
+        categories=frozenset(sys.intern(term.casefold()) for term in entry.xpath('atom:category/@term', namespaces=NAMESPACES)),
+        published=entry.findtext('atom:published', namespaces=NAMESPACES),
+        updated=entry.findtext('atom:updated', namespaces=NAMESPACES),
+        summary=entry.findtext('atom:summary', namespaces=NAMESPACES) or '',
+        media_thumbnail=thumbnail[0] if thumbnail else None,
+        guid=(entry.findtext('atom:id', namespaces=NAMESPACES) or '').strip(),
+    )
+
 
 class FeedReader:
 
-    def get_latest_news_by_category(
+    async def get_latest_news_by_category(
         self,
         feed_url: str,
         target_category: str | None = None,
         max_news_count: int = 1,
         prev_published: dt.datetime | None = None,
-        tmp_dir: Path = None
+        tmp_dir: Path = None,
+        seen_guids: Container[str] | None = None
     ) -> list[NewsItem]:
         """
         Get the latest news for each specified category.
@@ -28,36 +191,46 @@ class FeedReader:
         Args:
             feed_urls: List of RSS feed URLs
             target_categories: List of categories to filter
-            prev_published: Dictionary of previously published dates by category
+            prev_published: Publication date of the last published news of this category
             tmp_dir: Path to temporary directory for storing state
+            seen_guids: Guids of already published news, skipped
         
         Returns:
             List of latest news items sorted by publication date
         """
-        prev_published = prev_published or {}
-        tmp_dir = tmp_dir or Path(settings.TMP_DIR)
+        # casefold is lower() made Unicode-complete, used on both sides of the match
+        target_cf = sys.intern(target_category.casefold()) if target_category else None
         
         category_news: list[NewsItem] = []
         try:
-            feed = feedparser.parse(feed_url)
-            if feed.bozo:  # Check if feed parsing had errors
-                logger.warning(f"Feed parsing warning for {feed_url}: {feed.bozo_exception}")
+            try:
+                feed = await fetch_feed(feed_url)
+            except (etree.XMLSyntaxError, ValueError) as e:  # Check if feed parsing had errors
+                logger.warning(f"Feed parsing warning for {feed_url}: {e}")
                 return category_news
                 
+            # same cut-off for every entry of this poll
+            threshold = get_age_threshold()
+            previous_date = None
             for entry in feed.entries:
                 pub_date = _parse_publication_date(entry)
+                if previous_date is not None and pub_date > previous_date:
+                    logger.debug(f"{feed_url} is not newest first, consider FEEDS_ASSUME_CHRONOLOGICAL=false")
+                previous_date = pub_date
 
-                if _is_too_old(pub_date, prev_published, timedelta_days=1):
+                if is_too_old(pub_date, prev_published, threshold):
+                    if settings.FEEDS_ASSUME_CHRONOLOGICAL:
+                        # the rest of the feed is older still
+                        break
                     continue
 
                 if target_category:
                     entry_categories = _extract_categories(entry)
-                    if target_category.lower() not in entry_categories:
+                    if target_cf not in entry_categories:
                         continue
 
-                # if _is_already_published(pub_date, prev_published, target_category):
-                #     logger.info(f"Skipping already published news item: {entry.link}")
-                #     continue
+                if seen_guids and (entry.guid or entry.link) in seen_guids:
+                    continue
                     
                 news_item = create_news_item(entry, feed, pub_date, target_category)
                 category_news.append(news_item)
@@ -65,95 +238,63 @@ class FeedReader:
         except Exception as e:
             logger.error(f"Error processing feed {feed_url}: {str(e)}")
         
-        # Sort and limit results
-        return sorted(category_news, key=lambda x: x.published_at, reverse=True)[:max_news_count]
+        # Sort and limit results, only the newest max_news_count are kept
+        return heapq.nlargest(max_news_count, category_news, key=lambda x: x.published_at)
 
-def _parse_publication_date(entry: feedparser.FeedParserDict) -> dt.datetime | None:
+def _parse_publication_date(entry: FeedEntry) -> dt.datetime:
     """
     Parse publication date from feed entry with fallback options.
-    Returns timezone-aware datetime or None if too old.
+    Returns timezone-aware datetime, the current UTC time if the entry has no parsable date.
     """
-    date_fields = ['published', 'updated', 'created']
-    
-    for field in date_fields:
-        try:
-            if hasattr(entry, field):
-                # Parse date and ensure it's timezone-aware
-                date = parser.parse(getattr(entry, field))
-                
-                # If date is naive, assume UTC
-                if date.tzinfo is None:
-                    date = date.replace(tzinfo=timezone.utc)
-                return date
-        except (AttributeError, ValueError):
-            continue
+    for date_field in _DATE_FIELDS:
+        value = getattr(entry, date_field, None)
+        if value:
+            try:
+                # timezone-aware, naive dates are taken as UTC
+                return parse_feed_date(value.strip())
+            except ValueError:
+                continue
     
     # Return current time in UTC
-    return dt.now(timezone.utc)
+    return dt.datetime.now(timezone.utc)
 
 
-def _is_too_old(pub_date: dt.datetime, prev_published: dt.datetime, timedelta_days: int=1) -> bool:
-    """
-    Check if the publication date is older than 1 day.
-    Ensures timezone-aware comparison.
-    """
-    threshold = dt.datetime.now(timezone.utc) - timedelta(days=timedelta_days)
-    if pub_date < threshold:
-        return True
-    result = pub_date <= prev_published if prev_published else False
-    return result
-
-# def _is_already_published(published: dt.datetime, prev_published: dict[str, dt.datetime], categories: list[str]) -> bool:
-#     """
-#     Check if the publication date is older than the previously published date.
-#     Ensures timezone-aware comparison.
-#     """
-#     if not prev_published:
-#         return False
-#     for category in categories:
-#         if not prev_published.get(category.lower()):
-#             continue
-#         if prev_published.get(category.lower()) >= published.isoformat():
-#             return True
-#     return False
-
-
-def _extract_categories(entry: feedparser.FeedParserDict) -> list[str]:
-    """Extract categories from feed entry."""
-    if hasattr(entry, 'tags'):
-        return [tag.term.lower() for tag in entry.tags]
-    return []
-
-def create_news_item(entry: feedparser.FeedParserDict, feed: feedparser.FeedParserDict, pub_date: dt.datetime, category: str | None) -> NewsItem:
+def _extract_categories(entry: FeedEntry) -> frozenset[str]:
+    """Extract casefolded categories from feed entry, as a set for O(1) membership checks."""
+    return entry.categories
+
+def create_news_item(entry: FeedEntry, feed: ParsedFeed, pub_date: dt.datetime, category: str | None) -> NewsItem:
     """Create a structured news item from feed entry."""
-    news_item = NewsItem(
+    # fields come from _parse_feed_stream already typed, no need to validate them again
+    return NewsItem.model_construct(
         title=entry.title,
         link=entry.link,
         published_at=pub_date,
-        source=feed.feed.title,
+        source=feed.title,
         category=category,
-        summary=entry.get('summary', '')[:200] + '...',
-        img_link=None
+        summary=entry.summary[:200] + '...',
+        img_link=entry.media_thumbnail,
+        guid=entry.guid or entry.link
     )
 
-    if hasattr(entry, 'media_thumbnail') and entry.media_thumbnail:
-        news_item.img_link = entry.media_thumbnail[0]['url']
-    
-    return news_item
-
 
 
 def display_latest_news(news_list: list[NewsItem]) -> None:
-    """Display the latest news for each category."""
+    """Display the latest news for each category, with a single write to stdout."""
+    parts = []
     for item in news_list:
-        print(f"\nSource: {item.source}")
-        print(f"Title: {item.title}")
-        print(f"Published: {item.published_at}")
-        print(f"Category: {item.category}")
-        print(f"Link: {item.link}")
-        print(f"Summary: {item.summary}")
-        print(f"Image: {item.img_link or 'No image available'}")
-        print('='*50)
+        parts.extend((
+            f"\nSource: {item.source}",
+            f"Title: {item.title}",
+            f"Published: {item.published_at}",
+            f"Category: {item.category}",
+            f"Link: {item.link}",
+            f"Summary: {item.summary}",
+            f"Image: {item.img_link or 'No image available'}",
+            '='*50,
+        ))
+    if parts:
+        print("\n".join(parts))
 
 if __name__ == "__main__":
     # List of RSS feeds to check
@@ -174,12 +315,12 @@ if __name__ == "__main__":
     
     # Get the latest news for each category
     feed_reader = FeedReader()
-    latest_news = feed_reader.get_latest_news_by_category(
+    latest_news = asyncio.run(feed_reader.get_latest_news_by_category(
         feed_url=feed,
         target_category="Gaming",
         prev_published=prev_published,
         tmp_dir=Path(settings.TMP_DIR)
-    )
+    ))
     
     # Display the results
     display_latest_news(latest_news)
\ No newline at end of file
@@ -1,5 +1,5 @@
 import os
-import json
+import orjson
 import datetime as dt
 import logging
 import asyncio
@@ -7,101 +7,241 @@ from pathlib import Path
 from typing import Dict, Any
 from app.core.config import settings
 from app.core.exceptions import RewritedNewsIsTooLongError
-from app.core.news_rewriter import NewsRewriter
-from app.core.download_image import temp_download_async
+from app.core.news_rewriter import rewrite_news, rewrite_news_batch, close_rewriter
+from app.core.download_image import download_bytes_async, url_to_filename, close_client
 from app.core.channel_poster import ChannelPoster
-from app.core.prepare_image import convert_and_resize_image
-from app.core.sources.beincrypto_com.parse_news_feed import FeedReader as BeincryptoFeedRader
-from app.core.sources.decrypt_co.parse_news_feed import FeedReader as DecryptFeedRader
+from app.core.prepare_image import convert_and_resize_to_bytes
+from app.core.sources.beincrypto_com.parse_news_feed import FeedReader as BeincryptoFeedReader, close_client as close_beincrypto_client
+from app.core.sources.decrypt_co.parse_news_feed import FeedReader as DecryptFeedReader, close_client as close_decrypt_client
 from app.core.scheduler import SchedulerManager
 from app.core.models import NewsItem
+from app.core.seen_guids import SeenGuids
+
+try:
+    import uvloop
+except ImportError:  # not available on Windows
+    uvloop = None
 
 logger = logging.getLogger(settings.LOGGER_NAME)
 
+TMP_DIR = Path(settings.TMP_DIR)
+LAST_PUBLISHED_FILE = TMP_DIR / 'last_published.json'
+LAST_PUBLISHED_TMP_FILE = TMP_DIR / 'last_published.json.tmp'
+SEEN_GUIDS_FILE = TMP_DIR / 'seen_guids.json'
+
+# Service reports arriving within REPORT_BATCH_WAIT seconds are sent as one message
+REPORT_BATCH_WAIT = 1.0
+REPORT_BATCH_SIZE = 10
+REPORT_SEPARATOR = "\n---\n"
+TG_MAX_MESSAGE_LENGTH = 4096
+
+# Main loop is only a watchdog, jobs run on the scheduler: wake for the next job, at least hourly
+MIN_PAUSE = 15
+MAX_PAUSE = 3600
+
 # Global configurations
 SOURCE_READERS = {
     "beincrypto_com": {
-        "reader": BeincryptoFeedRader(),
+        "reader": BeincryptoFeedReader(),
         "feed_url": "https://beincrypto.com/press-release/feed/"
     },
     "decrypt_co": {
-        "reader": DecryptFeedRader(),
+        "reader": DecryptFeedReader(),
         "feed_url": "https://decrypt.co/feed"
     }
 }
 
+_poster: ChannelPoster | None = None
+_seen_guids: SeenGuids | None = None
+# last published dates by source and category, loaded from disk once
+_last_published: dict | None = None
+_persist_lock = asyncio.Lock()
+# None ends the report worker
+_report_queue: asyncio.Queue[str | None] | None = None
+_report_task: asyncio.Task | None = None
+
+def get_poster() -> ChannelPoster:
+    """Get shared poster, so all jobs reuse one bot session and share the Telegram rate limits."""
+    global _poster
+    if _poster is None:
+        _poster = ChannelPoster(
+            settings.tg_bot.TOKEN,
+            settings.tg_bot.TARGET_CHANNELS,
+            settings.tg_bot.SERVICE_CHANNELS
+        )
+    return _poster
+
+async def close_poster() -> None:
+    """Close shared poster bot session."""
+    global _poster
+    if _poster is not None:
+        await _poster.close()
+        _poster = None
+
+def get_seen_guids() -> SeenGuids:
+    """Get guids of already published news, loaded from disk on first use."""
+    global _seen_guids
+    if _seen_guids is None:
+        _seen_guids = SeenGuids(SEEN_GUIDS_FILE)
+        _seen_guids.load()
+    return _seen_guids
+
 async def send_service_report(msg: str):
-    """Send service report to designated channels."""
-    poster = ChannelPoster(
-        settings.tg_bot.TOKEN,
-        settings.tg_bot.TARGET_CHANNELS,
-        settings.tg_bot.SERVICE_CHANNELS
-    )
+    """Send service report to designated channels, through the report worker when it runs."""
+    if _report_queue is None:
+        await _send_service_report(msg)
+    else:
+        _report_queue.put_nowait(msg)
+
+async def _send_service_report(msg: str):
     try:
-        await poster.send_service_report(settings.tg_bot.SERVICE_CHANNELS, msg)
+        await get_poster().send_service_report(settings.tg_bot.SERVICE_CHANNELS, msg)
     except Exception as e:
         logger.error(f"Failed to send service report: {str(e)}")
-    finally:
-        await poster.close()
+
+def _join_reports(reports: list[str]) -> list[str]:
+    """Join reports into as few messages as fit Telegram's length limit, a longer report stays on its own."""
+    messages = []
+    for report in reports:
+        if messages and len(messages[-1]) + len(REPORT_SEPARATOR) + len(report) <= TG_MAX_MESSAGE_LENGTH:
+            messages[-1] += REPORT_SEPARATOR + report
+        else:
+            messages.append(report)
+    return messages
+
+async def _report_worker(queue: asyncio.Queue[str | None]):
+    """Send queued service reports, coalescing the ones that arrive close together."""
+    loop = asyncio.get_running_loop()
+    running = True
+    while running:
+        report = await queue.get()
+        if report is None:
+            break
+        batch = [report]
+        deadline = loop.time() + REPORT_BATCH_WAIT
+        while len(batch) < REPORT_BATCH_SIZE:
+            try:
+                report = await asyncio.wait_for(queue.get(), max(0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                break
+            if report is None:
+                running = False
+                break
+            batch.append(report)
+        for message in _join_reports(batch):
+            await _send_service_report(message)
+
+def start_report_worker():
+    """Start sending service reports in batches from a background task."""
+    global _report_queue, _report_task
+    if _report_task is None:
+        _report_queue = asyncio.Queue()
+        _report_task = asyncio.create_task(_report_worker(_report_queue))
+
+async def stop_report_worker():
+    """Send the still queued service reports and stop the report worker."""
+    global _report_queue, _report_task
+    if _report_task is not None:
+        _report_queue.put_nowait(None)
+        await _report_task
+        _report_queue = None
+        _report_task = None
 
 async def publish_news_to_channels(message: str, image_url: str = None):
     """Publish news to telegram channels."""
-    poster = ChannelPoster(
-        settings.tg_bot.TOKEN,
-        settings.tg_bot.TARGET_CHANNELS,
-        settings.tg_bot.SERVICE_CHANNELS
-    )
-    try:
-        if image_url:
-            async with temp_download_async(image_url, prefix=f"{settings.TMP_DIR}/downloading_") as temp_path:
-                prepared_image_path = convert_and_resize_image(temp_path, f"{temp_path}_prepared")
-                await poster.publish_news(message, image_path=prepared_image_path)
-        else:
+    poster = get_poster()
+    if image_url:
+        image_data = await download_bytes_async(image_url)
+        # decode, resize and encode in memory, in a thread so the event loop keeps going
+        prepared_image = await asyncio.to_thread(convert_and_resize_to_bytes, image_data)
+        if prepared_image is None:
+            logger.warning(f"Could not prepare image {image_url}, publishing without it")
             await poster.publish_news(message)
-    finally:
-        await poster.close()
+            return
+        image_name = Path(url_to_filename(image_url)).with_suffix('.jpg').name
+        await poster.publish_news(message, image_data=prepared_image, image_name=image_name)
+    else:
+        await poster.publish_news(message)
 
 def update_published_dates(prev_published: dict, source: str, category: str, pub_date: dt.datetime) -> None:
-    """Update and persist published dates."""
+    """Update published dates in memory, persist_published_dates() writes them to disk."""
+    source = source.lower()
+    category = category.lower()
+    published = prev_published.setdefault(source, {})
+    # items of a job are published concurrently, never move the date backwards
+    if category not in published or pub_date > published[category]:
+        # orjson writes datetimes as RFC 3339 itself
+        published[category] = pub_date
+
+async def persist_published_dates(prev_published: dict) -> None:
+    """Persist published dates atomically, off the event loop: write a temp file, then replace the old one."""
     try:
-        source = source.lower()
-        category = category.lower()
-        
-        if source not in prev_published:
-            prev_published[source] = {}
-        
-        prev_published[source][category] = pub_date.isoformat()
-        
-        last_published_file = Path(settings.TMP_DIR) / 'last_published.json'
-        last_published_file.write_text(json.dumps(prev_published))
-        
+        # serialized on the loop, other jobs may update the dict meanwhile
+        data = orjson.dumps(prev_published)
+        async with _persist_lock:
+            await asyncio.to_thread(_write_published_dates, data)
     except Exception as e:
         logger.error(f"Failed to update published dates: {str(e)}")
 
+async def persist_seen_guids(seen_guids: SeenGuids) -> None:
+    """Persist seen guids off the event loop, under the same lock as the published dates."""
+    # snapshot on the loop, jobs keep adding guids meanwhile
+    data = seen_guids.dumps()
+    async with _persist_lock:
+        await asyncio.to_thread(seen_guids.save, data)
+
+def _write_published_dates(data: bytes) -> None:
+    LAST_PUBLISHED_TMP_FILE.write_bytes(data)
+    os.replace(LAST_PUBLISHED_TMP_FILE, LAST_PUBLISHED_FILE)
+
 def load_last_published() -> Dict[str, Any]:
-    """Load last published dates from JSON file."""
+    """Load last published dates from JSON file, as datetimes."""
     try:
-        last_published_file = Path(settings.TMP_DIR) / 'last_published.json'
-        return json.loads(last_published_file.read_text())
+        prev_published = orjson.loads(LAST_PUBLISHED_FILE.read_bytes())
+        return {
+            source: {category: _parse_published_at(value) for category, value in categories.items()}
+            for source, categories in prev_published.items()
+        }
     except Exception as e:
         logger.error(f"Error reading last published dates: {str(e)}")
         return {}
 
-async def process_and_publish_item(item: NewsItem, source: str, category: str, prev_published: dict):
-    """Process and publish a single news item."""
+def _parse_published_at(value: str) -> dt.datetime:
+    # orjson writes RFC 3339, fromisoformat parses it in C, fractional seconds included
+    return dt.datetime.fromisoformat(value)
+
+def get_last_published() -> Dict[str, Any]:
+    """Get in-memory last published dates, jobs read and update them without touching the disk."""
+    global _last_published
+    if _last_published is None:
+        _last_published = load_last_published()
+    return _last_published
+
+async def process_and_publish_item(
+    item: NewsItem,
+    source: str,
+    category: str,
+    prev_published: dict,
+    news: str | BaseException | None = None
+):
+    """Process and publish a single news item. `news` is the already rewritten text (or its error), if any."""
     try:
-        news_rewriter = NewsRewriter(settings.openai.API_KEY)
-        news = news_rewriter.rewrite_news(
-            news_url=item.link,
-            max_news_text_len=settings.NEWS_TEXT_MAX_LENGTH,
-            max_rewriting_tries=settings.MAX_REWRITING_TRIES
-        )
+        if isinstance(news, BaseException):
+            raise news
+        if news is None:
+            news = await rewrite_news(
+                news_url=item.link,
+                max_news_text_len=settings.NEWS_TEXT_MAX_LENGTH,
+                max_rewriting_tries=settings.MAX_REWRITING_TRIES,
+                news_title=item.title
+            )
         
         await publish_news_to_channels(news, item.img_link)
         
         update_published_dates(
             prev_published, source, category, item.published_at
         )
+        get_seen_guids().add(item.guid)
         
         logger.info(f"Published {item.title} [{source} -> {category}]")
         await send_service_report(f"Published {item.title} [{source} -> {category}]\n{item.link}")
@@ -120,20 +260,21 @@ async def publish_news_job(**kwargs):
     category = kwargs.get('category')
     
     try:
-        prev_published = load_last_published()
-        last_published_at_str = prev_published.get(source, {}).get(category)
-        last_published_at = dt.datetime.strptime(last_published_at_str, "%Y-%m-%dT%H:%M:%S%z") if last_published_at_str else None
+        prev_published = get_last_published()
+        # keys are stored lowercased by update_published_dates
+        last_published_at = prev_published.get(source.lower(), {}).get(category.lower())
         
         source_config = SOURCE_READERS.get(source)
         if not source_config:
             raise ValueError(f"Unknown source: {source}")
         
-        news_feed = source_config["reader"].get_latest_news_by_category(
+        news_feed = await source_config["reader"].get_latest_news_by_category(
             feed_url=source_config["feed_url"],
             target_category=category,
             prev_published=last_published_at,
-            max_news_count=1,
-            tmp_dir=Path(settings.TMP_DIR)
+            max_news_count=settings.MAX_NEWS_PER_JOB,
+            tmp_dir=TMP_DIR,
+            seen_guids=get_seen_guids()
         )
         
         if not news_feed:
@@ -142,65 +283,113 @@ async def publish_news_job(**kwargs):
             )
             return
         
-        for item in news_feed:
-            await process_and_publish_item(item, source, category, prev_published)
+        rewritten_news = [None] * len(news_feed)
+        if len(news_feed) > 1:
+            # several items of one job are rewritten with a single OpenAI request
+            rewritten_news = await rewrite_news_batch(
+                [item.link for item in news_feed],
+                max_news_text_len=settings.NEWS_TEXT_MAX_LENGTH,
+                max_rewriting_tries=settings.MAX_REWRITING_TRIES,
+                news_titles=[item.title for item in news_feed]
+            )
+        
+        # up to MAX_NEWS_PER_JOB independent items, overlap their image downloads and Telegram posts,
+        # started oldest first so the rate-limited sends queue up in publication order
+        results = await asyncio.gather(
+            *(
+                process_and_publish_item(item, source, category, prev_published, news=news)
+                for item, news in reversed(list(zip(news_feed, rewritten_news)))
+            ),
+            return_exceptions=True
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        # one write per job, also keeps what was published next to a failure
+        if len(errors) < len(results):
+            await persist_published_dates(prev_published)
+            await persist_seen_guids(get_seen_guids())
+        if errors:
+            raise errors[0]
             
     except Exception as e:
         error_msg = f"Error in publish job ({source}/{category}): {str(e)}"
         logger.error(error_msg)
         await send_service_report(error_msg)
 
+def parse_publishing_schedule(schedule: list[dict]) -> list[tuple[str, str, int, int]]:
+    """Flatten publishing schedule into (source, category, hours, minutes) in one pass, bad time strings are logged and skipped."""
+    entries = []
+    for item in schedule:
+        for time_str in item['time']:
+            try:
+                hours, minutes = map(int, time_str.split(':'))
+            except ValueError as e:
+                logger.error(f"Invalid time format in schedule: {time_str} - {str(e)}")
+                continue
+            entries.append((item['source'], item['category'], hours, minutes))
+    return entries
+
 async def run_publisher():
     """Run the news publisher."""
     print("Starting News Publisher...")
     
     # Initialize
-    os.makedirs(settings.TMP_DIR, exist_ok=True)
-    last_published_file = Path(settings.TMP_DIR) / 'last_published.json'
-    if not last_published_file.exists():
-        last_published_file.write_text('{}')
+    TMP_DIR.mkdir(parents=True, exist_ok=True)
+    if not LAST_PUBLISHED_FILE.exists() or LAST_PUBLISHED_FILE.stat().st_size == 0:
+        LAST_PUBLISHED_FILE.write_bytes(b'{}')
     
     # Set up scheduler
     scheduler = SchedulerManager()
     scheduler.remove_all_jobs()
     # Schedule jobs
-    for item in settings.PUBLISHING_SCHEDULE:
-        for time_str in item['time']:
-            try:
-                hours, minutes = map(int, time_str.split(':'))
-                job_id = f"publish_news_{item['source']}_{item['category']}_{hours}_{minutes}"
-                
-                scheduler.schedule_job(
-                    job_func=publish_news_job,
-                    job_id=job_id,
-                    hours=hours,
-                    minutes=minutes,
-                    source=item['source'],
-                    category=item['category']
-                )
-            except ValueError as e:
-                logger.error(f"Invalid time format in schedule: {time_str} - {str(e)}")
-            except Exception as e:
-                logger.error(f"Failed to schedule job: {str(e)}")
+    for source, category, hours, minutes in parse_publishing_schedule(settings.PUBLISHING_SCHEDULE):
+        try:
+            scheduler.schedule_job(
+                job_func=publish_news_job,
+                job_id=f"publish_news_{source}_{category}_{hours}_{minutes}",
+                hours=hours,
+                minutes=minutes,
+                source=source,
+                category=category
+            )
+        except ValueError as e:
+            logger.error(f"Invalid time in schedule: {hours:02d}:{minutes:02d} - {str(e)}")
+        except Exception as e:
+            logger.error(f"Failed to schedule job: {str(e)}")
     
+    start_report_worker()
     scheduler.start()
     print(scheduler.get_jobs_report())
     
     try:
         while True:
-            period = 15
-            if dt.datetime.now().minute == 0 and dt.datetime.now().second < period:
-                next_job = scheduler.scheduler.get_jobs()[0].next_run_time
-                logger.info(f"Running. Next post scheduled for {next_job}")
-            await asyncio.sleep(period)
+            next_run = scheduler.get_next_run_time()
+            pause = MAX_PAUSE
+            if next_run:
+                logger.info(f"Running. Next post scheduled for {next_run}")
+                pause = (next_run - dt.datetime.now(next_run.tzinfo)).total_seconds()
+            await asyncio.sleep(max(MIN_PAUSE, min(MAX_PAUSE, pause)))
             
     except (KeyboardInterrupt, SystemExit):
         logger.info("Shutting down...")
     finally:
         scheduler.shutdown(wait=True)
+        if _last_published is not None:
+            await persist_published_dates(_last_published)
+        if _seen_guids is not None:
+            await persist_seen_guids(_seen_guids)
+        await close_client()
+        await close_decrypt_client()
+        await close_beincrypto_client()
+        await close_rewriter()
+        await stop_report_worker()
+        await close_poster()
 
 async def main():
     await run_publisher()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # uvloop is a faster drop-in event loop, the stdlib one is the fallback
+    if uvloop:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
\ No newline at end of file
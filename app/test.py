@@ -1,14 +1,14 @@
 import os
 from app.core.config import settings
-import json
+import orjson
 
 async def main():
 
     if not os.path.exists(settings.TMP_DIR):
             os.makedirs(settings.TMP_DIR)
     # await _publish_news_job()
-    with open(f"{settings.APP_DIR}/publishing_schedule.json", "r") as f:
-        schedule = json.load(f)
+    with open(f"{settings.APP_DIR}/publishing_schedule.json", "rb") as f:
+        schedule = orjson.loads(f.read())
     print(schedule)
 
 